@@ -0,0 +1,24 @@
+"""
+Supabase access token helpers shared by the structured output scripts.
+"""
+
+import base64
+
+import orjson
+
+
+def token_claims(access_token: str) -> dict:
+    """
+    Read the claims of a JWT without verifying it, the same way the agent reads `sub`.
+
+    Only for tokens Supabase just issued to us; the server verifies them on every request.
+
+    Raises:
+        ValueError: If the token is not a JWT with a JSON payload
+    """
+    try:
+        payload_b64 = access_token.split(".", 2)[1]
+    except IndexError:
+        raise ValueError("Access token is not a JWT") from None
+    padded = payload_b64 + "=" * (-len(payload_b64) % 4)
+    return orjson.loads(base64.urlsafe_b64decode(padded))
@@ -0,0 +1,115 @@
+"""
+Test cases for the structured output remote agent test.
+Each case names a stored schema (or None for plain text) and the prompt to send.
+"""
+
+# Test data for comprehensive OpenAI spec coverage
+
+# Test recipe for allergy analysis (Schema 8)
+FRESHPREP_TEST_RECIPE = """
+Pulled Chicken Fajitas
+with Chipotle-Pineapple Sauce & Cheddar
+Poultry - Local, Free Run, Antibiotic Free
+Milk
+Gluten
+Seafood
+Serves
+2
+Difficulty
+Moderate
+Time
+30 Min
+Ingredients
+Onion
+Chipotle Pepper in Adobo Sauce
+Chicken Breast
+Worcestershire Sauce
+Aged White Cheddar Cheese
+Flour Tortillas 6"
+Cilantro
+Assorted Mini Bell Peppers
+Coconut Sugar
+Green Cabbage
+Pineapple-Lime Juice
+Spice Blend
+Lime Crema
+* Pineapple-Lime Juice: Pineapple Juice , Fresh Lime Juice
+* Spice Blend: Smoked Paprika , Cumin
+* Lime Crema: Sour Cream , Mayonnaise , Fresh Lime Juice
+"""
+
+# Test recipe for nutrition analysis (Schema 1)
+SALMON_QUINOA_RECIPE = """
+Grilled Salmon with Quinoa and Roasted Vegetables
+- Grilled Salmon (6oz Atlantic salmon fillet)
+- Quinoa (1 cup cooked)
+- Roasted Broccoli (1 cup florets)
+- Olive Oil (2 tbsp for cooking)
+- Lemon (1 wedge)
+- Garlic and Herbs seasoning
+Serves: 2 people
+Estimated prep time: 30 minutes
+"""
+
+# Prompts that embed the recipes above
+NUTRITION_PROMPT = f"Analyze the nutritional content of this recipe:\n\n{SALMON_QUINOA_RECIPE}\n\nProvide calories, protein/fat/carbs in grams, number of servings, and prep time (round to nearest 5 minutes)."
+
+ALLERGY_PROMPT = f"Analyze this recipe for food allergens:\n\n{FRESHPREP_TEST_RECIPE}\n\nIdentify high-risk allergens with reasons, and provide recommendations for people with allergies."
+
+# Comprehensive test cases covering all OpenAI Structured Output features
+TEST_CASES = [
+    {
+        "name": "Test 0: No Schema (Baseline)",
+        "schema": None,
+        "prompt": "What is 2 + 3?",
+        "description": "Baseline test without structured output"
+    },
+    {
+        "name": "Test 1: RecipeNutritionAnalysis (Number Constraints)",
+        "schema": "RecipeNutritionAnalysis",
+        "prompt": NUTRITION_PROMPT,
+        "description": "Tests: min/max, ge/le, multipleOf constraints"
+    },
+    {
+        "name": "Test 2: IngredientClassification (Enums & Arrays)",
+        "schema": "IngredientClassification",
+        "prompt": "Classify this ingredient: Organic Almond Butter. Provide the ingredient name, categorize it (protein/grain/vegetable/fruit/dairy/condiment/spice), identify which dietary restrictions it fits (vegan/vegetarian/gluten-free/dairy-free/nut-free/kosher/halal), and list any allergen tags (max 5).",
+        "description": "Tests: enum, array of enums, minItems/maxItems"
+    },
+    {
+        "name": "Test 3: FoodSafetyReport ($defs & $ref)",
+        "schema": "FoodSafetyReport",
+        "prompt": "Generate a food safety inspection report for a commercial kitchen inspected on 2025-03-15. Inspection ID: INS-2025-0315. Found violations: 1) Improper food storage temperature in walk-in cooler (critical severity), corrective action: adjust thermostat and monitor; 2) Missing handwashing signage near prep area (minor severity), corrective action: install signage; 3) Expired ingredients in dry storage (major severity), corrective action: dispose and update inventory system. Calculate an overall safety score (0-100).",
+        "description": "Tests: nested objects with $ref, array of complex objects"
+    },
+    {
+        "name": "Test 4: MenuPlanning (Complex Nested Objects)",
+        "schema": "MenuPlanning",
+        "prompt": "Create a 3-day meal plan for a small restaurant starting Monday, April 1, 2025. Each day needs breakfast, lunch, and dinner. For each meal, provide dish name, main ingredients (list), and estimated cost per serving. Use a 'Spring Fresh' theme focusing on seasonal vegetables and local proteins.",
+        "description": "Tests: deeply nested objects, array of complex nested structures"
+    },
+    {
+        "name": "Test 5: RecipeInstructions (Recursive Schema)",
+        "schema": "RecipeInstructions",
+        "prompt": "Provide step-by-step instructions for making Homemade Sourdough Bread. Include the recipe name and total time. Break down into main steps, and for complex steps like 'Prepare the dough' or 'Shape and proof', include sub-steps. Each step should have a step number, instruction text, and duration in minutes.",
+        "description": "Tests: recursive schemas, self-referencing structures"
+    },
+    {
+        "name": "Test 6: SupplierQuote (Union Types & Pattern Validation)",
+        "schema": "SupplierQuote",
+        "prompt": "Generate a supplier quote: Supplier name is 'Fresh Farms Co.', contact email john.smith@freshfarms.com, phone number (555) 123-4567, quoting $450.00 for organic produce delivery. Expected delivery date is 2025-04-15. Add optional notes about requiring refrigerated transport.",
+        "description": "Tests: pattern validation (email, phone, date), union with null"
+    },
+    {
+        "name": "Test 7: QualityInspection (Multiple Enums & Format Validation)",
+        "schema": "QualityInspection",
+        "prompt": "Create a quality control inspection record: Batch ID BT-2025-0315 for processed tomatoes. Inspector email: qa.inspector@foodco.com. Inspection datetime: 2025-03-15T14:30:00. Assign a quality grade (A/B/C/D/F), set status (pending/approved/rejected/review_required), and list inspection findings such as color consistency, texture, no defects found.",
+        "description": "Tests: multiple enums, format validation (email, date-time), pattern (batch ID)"
+    },
+    {
+        "name": "Test 8: AllergyAnalysisResponse (Keep Existing)",
+        "schema": "AllergyAnalysisResponse",
+        "prompt": ALLERGY_PROMPT,
+        "description": "Tests: array of nested objects (proven working)"
+    }
+]
@@ -0,0 +1,67 @@
+"""
+Shared runner for the structured output test scripts.
+
+Each test's output is captured and written out in test order, so tests running in
+worker processes never interleave with each other or with the summary.
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Sequence
+
+
+def parse_args(description: str, jobs: bool = False) -> argparse.Namespace:
+    """Parse the script options: -v, plus -j N for suites that can run in worker processes"""
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-v", "--verbose", action="store_true", help="print tracebacks of failures")
+    if jobs:
+        parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N", help="run the tests in N worker processes")
+    return parser.parse_args()
+
+
+def format_failure(name: str, error: BaseException, verbose: bool = False) -> str:
+    """The report for a failed test: one line, followed by its traceback when verbose"""
+    report = f"\n❌ {name} FAILED: {error}\n"
+    if verbose:
+        report += "".join(traceback.format_exception(error))
+    return report
+
+
+def _run_captured(test_func: Callable[[], None], verbose: bool) -> tuple[str, bool]:
+    """Run one test, returning its output (with any failure report) and whether it passed"""
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            test_func()
+    except Exception as e:
+        buffer.write(format_failure(test_func.__name__, e, verbose))
+        return buffer.getvalue(), False
+    return buffer.getvalue(), True
+
+
+def run_tests(tests: Sequence[Callable[[], None]], jobs: int = 1, verbose: bool = False) -> int:
+    """
+    Run the tests, in `jobs` worker processes when jobs > 1, and write their output in order.
+
+    Returns:
+        The number of tests that passed
+    """
+    if jobs > 1:
+        # The tests share no state, so they can run in forked workers, which inherit any
+        # models already built; worth it only once there are well over `jobs` tests
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            outcomes = list(pool.map(_run_captured, tests, repeat(verbose)))
+    else:
+        outcomes = [_run_captured(test_func, verbose) for test_func in tests]
+
+    passed = 0
+    for output, ok in outcomes:
+        sys.stdout.write(output)
+        passed += ok
+    sys.stdout.flush()
+    return passed
@@ -1,14 +1,30 @@
 """
 Schema management script for CRUD operations on LangGraph memory store schemas.
+
+Run from the repository root:
+    python -m structured_output.schema_loader [store|list|delete NAME...|refresh]
 """
 
+from __future__ import annotations
+
 import os
+import sys
+import time
+import shlex
+import argparse
 import asyncio
+import functools
+from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
-from typing import List
-from langgraph_sdk import get_client
+from typing import List, TYPE_CHECKING
 from dotenv import load_dotenv
-from supabase import create_client, Client
+
+from structured_output.auth import token_claims
+
+# supabase and langgraph_sdk are heavy to import; they're only loaded once an operation needs them
+if TYPE_CHECKING:
+    from langgraph_sdk.client import LangGraphClient
+    from supabase import Client
 
 # Load environment variables
 load_dotenv()
@@ -19,31 +35,92 @@ SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 USER_EMAIL = os.environ.get("USER_EMAIL")
 USER_PASSWORD = os.environ.get("USER_PASSWORD")
 
+# Checked once here; raised before the first network call instead of passing None to Supabase
+_MISSING_ENV = [
+    name
+    for name, value in (
+        ("SUPABASE_URL", SUPABASE_URL),
+        ("SUPABASE_KEY", SUPABASE_KEY),
+        ("USER_EMAIL", USER_EMAIL),
+        ("USER_PASSWORD", USER_PASSWORD),
+    )
+    if not value
+]
+
 # LangGraph configuration
 LANGGRAPH_API_URL = "http://localhost:2024"  # Change if needed
+# Cap on in-flight store requests. The store API has no bulk put/delete, so batch operations
+# fan out single-item requests; they share the SDK client's keep-alive connection pool
+# (well above this cap), so concurrent requests reuse open connections.
+MAX_CONCURRENT_REQUESTS = 10
+
+# Seconds to reuse a Supabase access token before signing in again
+AUTH_CACHE_TTL = 300
+
+# Shared across schema operations so each one doesn't repeat the Supabase round-trips
+_auth_cache: dict | None = None
+
+@functools.lru_cache(maxsize=1)
+def _supabase() -> Client:
+    """Return the shared Supabase client, creating it on first use"""
+    if _MISSING_ENV:
+        raise ValueError(f"{', '.join(_MISSING_ENV)} must be set in .env file")
+    from supabase import create_client
+
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
 def authenticate_supabase() -> str:
-    """Authenticate with Supabase and return access token"""
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    """Authenticate with Supabase and return access token (cached for AUTH_CACHE_TTL seconds)"""
+    global _auth_cache
+    if _auth_cache and time.monotonic() < _auth_cache["expires_at"]:
+        return _auth_cache["token"]
+
+    supabase = _supabase()
     response = supabase.auth.sign_in_with_password({
         "email": USER_EMAIL,
         "password": USER_PASSWORD,
     })
     if response.session is None:
         raise RuntimeError(f"Supabase authentication failed: {response}")
-    return response.session.access_token
+    access_token = response.session.access_token
+
+    # The user ID is the token's `sub` claim, so read it locally instead of calling get_user.
+    # We just minted this token ourselves and the server verifies it on every request.
+    _auth_cache = {
+        "token": access_token,
+        "user_id": token_claims(access_token)["sub"],
+        "expires_at": time.monotonic() + AUTH_CACHE_TTL,
+    }
+    return access_token
+
+def get_authenticated_client() -> tuple[LangGraphClient, str]:
+    """Get authenticated LangGraph client and the access token it sends"""
+    from langgraph_sdk import get_client
 
-def get_authenticated_client():
-    """Get authenticated LangGraph client"""
     access_token = authenticate_supabase()
     headers = {
         "accept": "application/json",
         "Authorization": f"Bearer {access_token}",
     }
-    return get_client(url=LANGGRAPH_API_URL, headers=headers)
+    return get_client(url=LANGGRAPH_API_URL, headers=headers), access_token
+
+async def _get_client_and_user() -> tuple[LangGraphClient, str]:
+    """Get authenticated LangGraph client and the user ID its token belongs to"""
+    # Supabase auth calls are blocking, so keep them off the event loop
+    client, _ = await asyncio.to_thread(get_authenticated_client)
+    # The sign-in above cached the user ID alongside the token the client sends
+    return client, _auth_cache["user_id"]
 
 # Define test schemas using Pydantic - Full OpenAI Spec Coverage
 
+# String patterns shared by the schemas below. They stay as `pattern=` constraints so they
+# are part of the stored JSON schema; Pydantic compiles each one when the model is built.
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_PATTERN = r'^\(\d{3}\) \d{3}-\d{4}$'
+DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}$'
+DATETIME_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$'
+BATCH_ID_PATTERN = r'^BT-\d{4}-\d{4}$'
+
 # Schema 1: Number constraints (min/max, multipleOf, exclusive bounds)
 class RecipeNutritionAnalysis(BaseModel):
     """Nutritional analysis of a recipe with validation constraints"""
@@ -117,8 +194,9 @@ class RecipeStep(BaseModel):
     sub_steps: List['RecipeStep'] = Field(default_factory=list, description="Optional sub-steps")
 
 
-# Enable forward references
-RecipeStep.model_rebuild()
+# Enable forward references (self-references usually resolve at class creation already)
+if not RecipeStep.__pydantic_complete__:
+    RecipeStep.model_rebuild()
 
 
 class RecipeInstructions(BaseModel):
@@ -133,12 +211,12 @@ class SupplierQuote(BaseModel):
     """Supplier quotation with optional fields"""
     supplier_name: str = Field(..., description="Name of the supplier company")
     contact_email: str = Field(..., description="Contact email address",
-                               pattern=r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+                               pattern=EMAIL_PATTERN)
     contact_phone: str = Field(..., description="Contact phone number",
-                              pattern=r'^\(\d{3}\) \d{3}-\d{4}$')
+                              pattern=PHONE_PATTERN)
     quoted_price: float = Field(..., gt=0, description="Quoted price in dollars")
     delivery_date: str = Field(..., description="Expected delivery date (YYYY-MM-DD)",
-                              pattern=r'^\d{4}-\d{2}-\d{2}$')
+                              pattern=DATE_PATTERN)
     notes: str | None = Field(None, description="Optional notes about the quote")
 
 
@@ -146,11 +224,11 @@ class SupplierQuote(BaseModel):
 class QualityInspection(BaseModel):
     """Quality control inspection record"""
     inspector_email: str = Field(..., description="Inspector's email",
-                                pattern=r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+                                pattern=EMAIL_PATTERN)
     inspection_datetime: str = Field(..., description="Date and time of inspection (ISO format)",
-                                    pattern=r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}$')
+                                    pattern=DATETIME_PATTERN)
     batch_id: str = Field(..., description="Batch identifier",
-                         pattern=r'^BT-\d{4}-\d{4}$')
+                         pattern=BATCH_ID_PATTERN)
     quality_grade: str = Field(..., description="Quality grade",
                               json_schema_extra={"enum": ["A", "B", "C", "D", "F"]})
     status: str = Field(..., description="Inspection status",
@@ -168,45 +246,66 @@ class AllergyAnalysisResponse(BaseModel):
     high_risk_allergen: List[AllergenEntry] = Field(description="List of allergen-risk mappings")
     recommendation: str = Field(description="Overall recommendation for handling this recipe")
 
-async def store_schemas():
-    """Store all test schemas in the LangGraph memory store"""
-    client = get_authenticated_client()
-
-    # Get user info to build namespace
-    access_token = authenticate_supabase()
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    user_response = supabase.auth.get_user(access_token)
-    user_id = user_response.user.id
-
-    # All 8 comprehensive schemas covering OpenAI specs
-    schemas = {
-        "RecipeNutritionAnalysis": RecipeNutritionAnalysis.model_json_schema(),
-        "IngredientClassification": IngredientClassification.model_json_schema(),
-        "FoodSafetyReport": FoodSafetyReport.model_json_schema(),
-        "MenuPlanning": MenuPlanning.model_json_schema(),
-        "RecipeInstructions": RecipeInstructions.model_json_schema(),
-        "SupplierQuote": SupplierQuote.model_json_schema(),
-        "QualityInspection": QualityInspection.model_json_schema(),
-        "AllergyAnalysisResponse": AllergyAnalysisResponse.model_json_schema(),
-    }
 
-    print(f"Storing {len(schemas)} schemas for user {user_id}...")
-    for name, schema_json in schemas.items():
+# Stored in each schema's "$comment", so refresh only ever deletes schemas this script wrote
+SCHEMA_MARKER = "Managed by structured_output.schema_loader"
+
+# All 8 comprehensive schemas covering OpenAI specs, generated once at import
+_SCHEMA_CACHE: dict[str, dict] = {
+    model.__name__: {**model.model_json_schema(), "$comment": SCHEMA_MARKER}
+    for model in (
+        RecipeNutritionAnalysis,
+        IngredientClassification,
+        FoodSafetyReport,
+        MenuPlanning,
+        RecipeInstructions,
+        SupplierQuote,
+        QualityInspection,
+        AllergyAnalysisResponse,
+    )
+}
+
+@asynccontextmanager
+async def _schemas_ns():
+    """Yield an authenticated LangGraph client and the user's schemas namespace"""
+    client, user_id = await _get_client_and_user()
+    try:
         # Use [user_id, "schemas"] as namespace to satisfy auth requirements
-        await client.store.put_item([user_id, "schemas"], name, schema_json)
-        print(f"  ✅ Stored schema: {name}")
+        yield client, [user_id, "schemas"]
+    finally:
+        await client.aclose()
 
-async def list_schemas() -> List[str]:
-    """List all available schemas in the memory store"""
-    client = get_authenticated_client()
+async def _gather_limited(*requests):
+    """Await the store requests concurrently, at most MAX_CONCURRENT_REQUESTS at a time"""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
 
-    # Get user info to build namespace
-    access_token = authenticate_supabase()
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    user_response = supabase.auth.get_user(access_token)
-    user_id = user_response.user.id
+    async def limited(request):
+        async with semaphore:
+            return await request
 
-    results = await client.store.search_items([user_id, "schemas"])
+    return await asyncio.gather(*(limited(request) for request in requests))
+
+async def _put_schema(client: LangGraphClient, namespace: list[str], name: str, schema_json: dict):
+    await client.store.put_item(namespace, name, schema_json)
+    print(f"  ✅ Stored schema: {name}")
+
+async def _delete_schema(client: LangGraphClient, namespace: list[str], name: str):
+    await client.store.delete_item(namespace, name)
+    print(f"  🗑️  Deleted schema: {name}")
+
+async def store_schemas():
+    """Store all test schemas in the LangGraph memory store"""
+    async with _schemas_ns() as (client, namespace):
+        print(f"Storing {len(_SCHEMA_CACHE)} schemas for user {namespace[0]}...")
+        # Puts are independent, so send them concurrently instead of one RTT each
+        await _gather_limited(*(
+            _put_schema(client, namespace, name, schema_json) for name, schema_json in _SCHEMA_CACHE.items()
+        ))
+
+async def list_schemas() -> List[str]:
+    """List all available schemas in the memory store"""
+    async with _schemas_ns() as (client, namespace):
+        results = await client.store.search_items(namespace)
     schemas = [item["key"] for item in results["items"]]
     print("Available schemas:")
     for schema in schemas:
@@ -215,16 +314,34 @@ async def list_schemas() -> List[str]:
 
 async def delete_schema(schema_name: str):
     """Delete a schema from the memory store"""
-    client = get_authenticated_client()
-
-    # Get user info to build namespace
-    access_token = authenticate_supabase()
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    user_response = supabase.auth.get_user(access_token)
-    user_id = user_response.user.id
-
-    await client.store.delete_item([user_id, "schemas"], schema_name)
-    print(f"Deleted schema: {schema_name}")
+    async with _schemas_ns() as (client, namespace):
+        await _delete_schema(client, namespace, schema_name)
+
+async def delete_schemas(schema_names: List[str]):
+    """Delete several schemas from the memory store concurrently"""
+    async with _schemas_ns() as (client, namespace):
+        await _gather_limited(*(_delete_schema(client, namespace, name) for name in schema_names))
+
+async def refresh_schemas():
+    """
+    Sync the memory store with the local schemas: store changed ones and delete stale ones.
+
+    Only schemas carrying SCHEMA_MARKER count as stale; ones created elsewhere (e.g. the UI) are kept.
+    """
+    async with _schemas_ns() as (client, namespace):
+        results = await client.store.search_items(namespace, limit=100)
+        stored = {item["key"]: item["value"] for item in results["items"]}
+        to_put = {name: schema_json for name, schema_json in _SCHEMA_CACHE.items() if stored.get(name) != schema_json}
+        to_delete = [
+            name for name, value in stored.items()
+            if name not in _SCHEMA_CACHE and isinstance(value, dict) and value.get("$comment") == SCHEMA_MARKER
+        ]
+
+        print(f"Refreshing schemas: {len(to_put)} to store, {len(to_delete)} to delete")
+        await _gather_limited(
+            *(_put_schema(client, namespace, name, schema_json) for name, schema_json in to_put.items()),
+            *(_delete_schema(client, namespace, name) for name in to_delete),
+        )
 
 async def main():
     print("Loading test schemas for structured output...")
@@ -233,7 +350,62 @@ async def main():
 
     # Example: delete a schema (uncomment to test)
     # await delete_schema("OutputSchemaB")
+    # await delete_schemas(["OutputSchemaA", "OutputSchemaB"])
     # await list_schemas()
 
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Manage structured output schemas in the LangGraph memory store")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Read commands from stdin in one session, reusing the auth cache between them",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("store", help="Store all test schemas")
+    subparsers.add_parser("list", help="List stored schemas")
+    delete_parser = subparsers.add_parser("delete", help="Delete one or more schemas")
+    delete_parser.add_argument("names", nargs="+", help="Schema names to delete")
+    subparsers.add_parser("refresh", help="Store changed schemas and delete stale ones")
+    return parser
+
+async def _run_command(args: argparse.Namespace):
+    if args.command == "store":
+        await store_schemas()
+    elif args.command == "list":
+        await list_schemas()
+    elif args.command == "delete":
+        await delete_schemas(args.names)
+    elif args.command == "refresh":
+        await refresh_schemas()
+    else:
+        await main()
+
+async def _cli_loop(parser: argparse.ArgumentParser):
+    """Run commands read from stdin until EOF or `quit`, on one event loop"""
+    while True:
+        line = await asyncio.to_thread(sys.stdin.readline)
+        if not line or line.strip() in ("quit", "exit"):
+            break
+        if not line.strip():
+            continue
+        try:
+            args = parser.parse_args(shlex.split(line))
+        except ValueError as e:
+            # shlex couldn't split the line, e.g. an unbalanced quote
+            print(f"❌ Could not parse {line.strip()!r}: {e}")
+            continue
+        except SystemExit:
+            # argparse already printed the usage error
+            continue
+        try:
+            await _run_command(args)
+        except Exception as e:
+            print(f"❌ {args.command} failed: {e}")
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = _build_parser()
+    args = parser.parse_args()
+    if args.daemon:
+        asyncio.run(_cli_loop(parser))
+    else:
+        asyncio.run(_run_command(args))
@@ -1,16 +1,20 @@
 """
 Test advanced features for schema parser.
 Tests: $ref, $defs, anyOf, recursive schemas
+
+Run from the repository root (add -v for tracebacks of failures):
+    python -m structured_output.test_advanced
 """
 
+import asyncio
 import sys
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import types
+import typing
 
-from tools_agent.utils.structured_output import create_pydantic_model_from_json_schema
+from structured_output.runner import parse_args, run_tests
+from tools_agent.utils import structured_output as schema_parser
 from structured_output.test_schemas import (
+    get_model,
     DEFINITIONS_SCHEMA,
     ANYOF_USER_ADDRESS_SCHEMA,
     RECURSIVE_UI_SCHEMA,
@@ -18,13 +22,14 @@ from structured_output.test_schemas import (
 )
 from pydantic import ValidationError
 import json
+import orjson
 
 
 def test_definitions_and_ref():
     """Test $defs and $ref support"""
     print("\n=== Test 1: $defs and $ref ===")
 
-    Model = create_pydantic_model_from_json_schema(DEFINITIONS_SCHEMA, "DefinitionsTest")
+    Model = get_model(DEFINITIONS_SCHEMA, "DefinitionsTest")
 
     # Create instance with steps
     instance = Model(
@@ -49,7 +54,7 @@ def test_anyof_union():
     """Test anyOf with multiple object types"""
     print("\n=== Test 2: anyOf (Union Types) ===")
 
-    Model = create_pydantic_model_from_json_schema(ANYOF_USER_ADDRESS_SCHEMA, "AnyOfTest")
+    Model = get_model(ANYOF_USER_ADDRESS_SCHEMA, "AnyOfTest")
 
     # Create with user object
     instance1 = Model(item={
@@ -73,7 +78,7 @@ def test_recursive_schema_with_defs():
     """Test recursive schema using $defs and $ref"""
     print("\n=== Test 3: Recursive Schema (Linked List) ===")
 
-    Model = create_pydantic_model_from_json_schema(RECURSIVE_LINKED_LIST_SCHEMA, "LinkedListTest")
+    Model = get_model(RECURSIVE_LINKED_LIST_SCHEMA, "LinkedListTest")
 
     # Create a linked list: 1 -> 2 -> 3 -> None
     instance = Model(linked_list={
@@ -102,7 +107,7 @@ def test_recursive_schema_root_ref():
     # This test will attempt to create a UI component structure
 
     try:
-        Model = create_pydantic_model_from_json_schema(RECURSIVE_UI_SCHEMA, "UIComponentTest")
+        Model = get_model(RECURSIVE_UI_SCHEMA, "UIComponentTest")
 
         # Create a simple UI structure
         instance = Model(
@@ -172,7 +177,7 @@ def test_simple_ref_within_defs():
         "required": ["person"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "RefBetweenDefsTest")
+    Model = get_model(schema, "RefBetweenDefsTest")
 
     instance = Model(person={
         "name": "John",
@@ -204,7 +209,7 @@ def test_anyof_with_null():
         "required": ["optional_field"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "AnyOfNullTest")
+    Model = get_model(schema, "AnyOfNullTest")
 
     # With value
     instance1 = Model(optional_field="some value")
@@ -232,7 +237,7 @@ def test_anyof_with_primitives():
         "required": ["flexible_field"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "AnyOfPrimitivesTest")
+    Model = get_model(schema, "AnyOfPrimitivesTest")
 
     # With string
     instance1 = Model(flexible_field="text")
@@ -284,7 +289,7 @@ def test_nested_refs():
         "required": ["root"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "NestedRefsTest")
+    Model = get_model(schema, "NestedRefsTest")
 
     instance = Model(root={
         "level2": {
@@ -326,7 +331,7 @@ def test_array_of_refs():
         "required": ["items"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "ArrayOfRefsTest")
+    Model = get_model(schema, "ArrayOfRefsTest")
 
     instance = Model(items=[
         {"id": 1, "name": "First"},
@@ -373,7 +378,7 @@ def test_complex_anyof():
         "required": ["data"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "ComplexAnyOfTest")
+    Model = get_model(schema, "ComplexAnyOfTest")
 
     # Single value variant
     instance1 = Model(data={
@@ -390,8 +395,240 @@ def test_complex_anyof():
     print(f"✅ Created multiple values variant")
 
 
-def run_all_tests():
-    """Run all advanced feature tests"""
+def test_member_order_preserved():
+    """Test that enum and anyOf member order survives building an equal type in another order"""
+    print("\n=== Test 11: Member Order ===")
+
+    def schema(enum_values, item_types):
+        return {
+            "type": "object",
+            "properties": {
+                "status": {"type": "string", "enum": enum_values},
+                "items": {"type": "array", "items": {"anyOf": [{"type": t} for t in item_types]}},
+            },
+            "required": ["status", "items"],
+        }
+
+    get_model(schema(["a", "b"], ["integer", "string"]), "MemberOrderFirstTest")
+    Model = get_model(schema(["b", "a"], ["string", "integer"]), "MemberOrderSecondTest")
+
+    properties = Model.model_json_schema()["properties"]
+    assert properties["status"]["enum"] == ["b", "a"], properties["status"]
+    assert [option["type"] for option in properties["items"]["items"]["anyOf"]] == ["string", "integer"], properties["items"]
+    print(f"✅ Second model kept its own member order")
+
+
+def test_from_trusted():
+    """Test that from_trusted skips validation on models and is never set on primitive roots"""
+    print("\n=== Test 12: Trusted Construction ===")
+
+    for root in ({"type": "string"}, {"type": ["string"]}):
+        assert get_model(root, "TrustedPrimitiveTest") is str
+    assert not hasattr(typing.Any, "from_trusted")
+    print(f"✅ Primitive roots return str without from_trusted")
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "address": {
+                "type": "object",
+                "properties": {"city": {"type": "string"}},
+                "required": ["city"],
+            },
+        },
+        "required": ["name", "address"],
+    }
+    Model = get_model(schema, "TrustedNestedTest")
+    instance = Model.from_trusted({"name": "Ada", "address": {"city": "London"}})
+    assert instance.name == "Ada"
+    # Nested objects are not converted to their models
+    assert instance.address == {"city": "London"}, instance.address
+    print(f"✅ Nested object kept as a dict: {instance.address}")
+
+
+def test_shared_defs():
+    """Test that identical $defs entries share one type across schemas, and changed ones don't"""
+    print("\n=== Test 13: Shared $defs ===")
+
+    def schema(address_properties, extra_defs=None):
+        return {
+            "type": "object",
+            "properties": {"home": {"$ref": "#/$defs/address"}},
+            "required": ["home"],
+            "$defs": {
+                "address": {
+                    "type": "object",
+                    "properties": address_properties,
+                    "required": list(address_properties),
+                },
+                **(extra_defs or {}),
+            },
+        }
+
+    city = {"city": {"type": "string"}}
+    first = get_model(schema(city), "SharedDefsFirstTest")
+    second = get_model(schema(city), "SharedDefsSecondTest")
+    assert first is not second
+    assert first.model_fields["home"].annotation is second.model_fields["home"].annotation
+    print(f"✅ Identical $defs entry shared by two root schemas")
+
+    changed = get_model(schema({"city": {"type": "string"}, "zip": {"type": "string"}}), "SharedDefsChangedTest")
+    address = changed.model_fields["home"].annotation
+    assert address is not first.model_fields["home"].annotation
+    assert set(address.model_fields) == {"city", "zip"}, address.model_fields
+    print(f"✅ Changed $defs entry got a new type")
+
+    # A recursive definition is rebuilt per schema while its leaf address comes from the cache
+    recursive = schema(city, {
+        "node": {
+            "type": "object",
+            "properties": {
+                "address": {"$ref": "#/$defs/address"},
+                "next": {"anyOf": [{"$ref": "#/$defs/node"}, {"type": "null"}]},
+            },
+            "required": ["address", "next"],
+        },
+    })
+    recursive["properties"]["chain"] = {"$ref": "#/$defs/node"}
+    recursive["required"].append("chain")
+    Model = get_model(recursive, "SharedDefsRecursiveTest")
+    instance = Model.model_validate({
+        "home": {"city": "Paris"},
+        "chain": {"address": {"city": "Lyon"}, "next": {"address": {"city": "Nice"}, "next": None}},
+    })
+    assert instance.chain.next.address.city == "Nice"
+    assert type(instance.home) is first.model_fields["home"].annotation
+    print(f"✅ Recursive $defs entry resolved with a cached leaf: {instance.chain.next.address.city}")
+
+
+def test_model_cache():
+    """Test that the model cache hits on equal schemas, keys on the model name and evicts the least recently used"""
+    print("\n=== Test 14: Model Cache ===")
+
+    schema = {"type": "object", "properties": {"n": {"type": "integer"}}, "required": ["n"]}
+    first = get_model(schema, "ModelCacheTest")
+    assert get_model(dict(schema), "ModelCacheTest") is first
+    print(f"✅ Equal schema and name returned the cached model")
+
+    assert get_model(schema, "ModelCacheOtherTest") is not first
+    print(f"✅ Another model name built another model")
+
+    original_size = schema_parser.MODEL_CACHE_SIZE
+    schema_parser.MODEL_CACHE_SIZE = 2
+    try:
+        kept = get_model(schema, "ModelCacheKeptTest")
+        evicted = get_model(schema, "ModelCacheEvictedTest")
+        get_model(schema, "ModelCacheKeptTest")
+        # Past the size, the least recently used model (not the oldest built) is dropped
+        get_model(schema, "ModelCacheNewTest")
+        assert len(schema_parser._MODEL_CACHE) == 2
+        assert get_model(schema, "ModelCacheKeptTest") is kept
+        assert get_model(schema, "ModelCacheEvictedTest") is not evicted
+    finally:
+        schema_parser.MODEL_CACHE_SIZE = original_size
+    print(f"✅ Least recently used model evicted at the size limit")
+
+
+def test_nullable_anyof():
+    """Test the nullable anyOf pair in either order, including a recursive $ref option"""
+    print("\n=== Test 15: Nullable anyOf ===")
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "label": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+            "count": {"anyOf": [{"type": "null"}, {"type": "integer"}]},
+            "head": {"$ref": "#/$defs/node"},
+        },
+        "required": ["label", "count", "head"],
+        "$defs": {
+            "node": {
+                "type": "object",
+                "properties": {"next": {"anyOf": [{"$ref": "#/$defs/node"}, {"type": "null"}]}},
+                "required": ["next"],
+            },
+        },
+    }
+    Model = get_model(schema, "NullableAnyOfTest")
+
+    # The non-null option keeps its position in the union
+    assert typing.get_args(Model.model_fields["label"].annotation) == (str, type(None))
+    assert typing.get_args(Model.model_fields["count"].annotation) == (type(None), int)
+    print(f"✅ Member order kept: {Model.model_fields['label'].annotation}, {Model.model_fields['count'].annotation}")
+
+    instance = Model(label=None, count=3, head={"next": {"next": None}})
+    assert instance.label is None and instance.count == 3
+    assert instance.head.next.next is None
+    try:
+        Model(label=1, count=None, head={"next": None})
+    except ValidationError as e:
+        print(f"✅ Rejected a non-null value of the wrong type: {e.error_count()} error(s)")
+    else:
+        raise AssertionError("Nullable string accepted an integer")
+
+
+def test_enum_memo():
+    """Test that equal enums share one Literal, while values that only compare equal stay distinct"""
+    print("\n=== Test 16: Enum Memo ===")
+
+    schema = {
+        "type": "object",
+        "properties": {
+            "first": {"enum": [1, 2]},
+            "second": {"enum": [1, 2]},
+            "flags": {"enum": [True, False]},
+            "ratios": {"enum": [1.0, 2.0]},
+            "pairs": {"enum": [[1, 2], [3, 4]]},
+        },
+        "required": ["first", "second", "flags", "ratios", "pairs"],
+    }
+    Model = get_model(schema, "EnumMemoTest")
+    fields = Model.model_fields
+
+    assert fields["first"].annotation is fields["second"].annotation
+    print(f"✅ Equal enums share one type: {fields['first'].annotation}")
+
+    # 1 == True == 1.0, so a key on the values alone would hand these the integer Literal
+    assert [type(value) for value in typing.get_args(fields["flags"].annotation)] == [bool, bool]
+    assert [type(value) for value in typing.get_args(fields["ratios"].annotation)] == [float, float]
+    print(f"✅ Values kept their types: {fields['flags'].annotation}, {fields['ratios'].annotation}")
+
+    # Unhashable values skip the memo
+    assert typing.get_args(fields["pairs"].annotation) == ([1, 2], [3, 4])
+    print(f"✅ Unhashable enum values built without the memo")
+
+
+def test_load_stored_schema():
+    """Test that load_schema_model decodes schemas stored as dicts, JSON text or JSON bytes alike"""
+    print("\n=== Test 17: Stored Schema Decoding ===")
+
+    schema = {"type": "object", "properties": {"n": {"type": "integer"}}, "required": ["n"]}
+
+    class Store:
+        def __init__(self, value):
+            self.value = value
+
+        async def aget(self, namespace, key):
+            return types.SimpleNamespace(value=self.value) if namespace == ("schemas",) else None
+
+    original_get_store = schema_parser.get_store
+    try:
+        models = []
+        for value in (schema, orjson.dumps(schema).decode(), orjson.dumps(schema)):
+            schema_parser.get_store = lambda: Store(value)
+            models.append(asyncio.run(schema_parser.load_schema_model("StoredSchemaTest", user_id="user")))
+    finally:
+        schema_parser.get_store = original_get_store
+
+    # Each decodes to the same schema, so all three come back as the one cached model
+    assert models[0] is models[1] is models[2]
+    assert models[0](n=1).n == 1
+    print(f"✅ dict, str and bytes values built the same model: {models[0].__name__}")
+
+
+def run_all_tests(verbose: bool = False):
+    """Run all advanced feature tests (tracebacks for failures only when verbose)"""
     print("=" * 80)
     print("ADVANCED FEATURE TESTS - $ref, $defs, anyOf, Recursive")
     print("=" * 80)
@@ -407,20 +644,17 @@ def run_all_tests():
         test_nested_refs,
         test_array_of_refs,
         test_complex_anyof,
+        test_member_order_preserved,
+        test_from_trusted,
+        test_shared_defs,
+        test_model_cache,
+        test_nullable_anyof,
+        test_enum_memo,
+        test_load_stored_schema,
     ]
 
-    passed = 0
-    failed = 0
-
-    for test_func in tests:
-        try:
-            test_func()
-            passed += 1
-        except Exception as e:
-            print(f"\n❌ {test_func.__name__} FAILED: {e}")
-            import traceback
-            traceback.print_exc()
-            failed += 1
+    passed = run_tests(tests, verbose=verbose)
+    failed = len(tests) - passed
 
     print("\n" + "=" * 80)
     print(f"RESULTS: {passed} passed, {failed} failed out of {len(tests)} tests")
@@ -430,5 +664,5 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    success = run_all_tests(parse_args(__doc__).verbose)
     sys.exit(0 if success else 1)
\ No newline at end of file
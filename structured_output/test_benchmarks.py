@@ -0,0 +1,54 @@
+"""
+Benchmarks for validating data against models built from the test schemas.
+Only the validation call is timed; model construction happens once, outside the timed region.
+
+Requires pytest-benchmark, part of the dev dependency group (`uv sync --group dev`):
+    uv run pytest structured_output/test_benchmarks.py --benchmark-only
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from structured_output.test_schemas import (
+    get_model,
+    USER_DATA_SCHEMA,
+    WEATHER_SCHEMA,
+    WEATHER_OPTIONAL_SCHEMA,
+    DEFINITIONS_SCHEMA,
+    RECURSIVE_LINKED_LIST_SCHEMA,
+    SIMPLE_ARRAY_SCHEMA,
+    NESTED_OBJECT_SCHEMA,
+    NUMBER_CONSTRAINTS_SCHEMA,
+    MULTIPLE_ENUMS_SCHEMA,
+    ARRAY_OF_OBJECTS_SCHEMA,
+)
+
+# (model name, schema, valid input)
+CASES = [
+    ("UserData", USER_DATA_SCHEMA, {"name": "John Doe", "username": "@john_doe_123", "email": "john.doe@example.com"}),
+    ("Weather", WEATHER_SCHEMA, {"location": "San Francisco", "unit": "F"}),
+    ("WeatherOptional", WEATHER_OPTIONAL_SCHEMA, {"location": "Paris", "unit": None}),
+    ("StepsResponse", DEFINITIONS_SCHEMA, {
+        "steps": [{"explanation": "Parse the input", "output": "tokens: [...]"}],
+        "final_answer": "42",
+    }),
+    ("LinkedListContainer", RECURSIVE_LINKED_LIST_SCHEMA, {
+        "linked_list": {"value": 10, "next": {"value": 20, "next": None}},
+    }),
+    ("SimpleArrayTest", SIMPLE_ARRAY_SCHEMA, {"tags": ["python", "testing", "pydantic"]}),
+    ("NestedObjectTest", NESTED_OBJECT_SCHEMA, {
+        "user": {"name": "Bob", "address": {"street": "123 Main St", "city": "Springfield"}},
+    }),
+    ("NumberConstraintsTest", NUMBER_CONSTRAINTS_SCHEMA, {"age": 25, "price": 10.50}),
+    ("MultipleEnumsTest", MULTIPLE_ENUMS_SCHEMA, {"status": "approved", "priority": "high"}),
+    ("ArrayOfObjectsTest", ARRAY_OF_OBJECTS_SCHEMA, {"items": [{"id": 1, "name": "Item 1"}, {"id": 2, "name": "Item 2"}]}),
+]
+
+
+@pytest.mark.parametrize("name, schema, data", CASES, ids=[case[0] for case in CASES])
+def test_validate(benchmark, name, schema, data):
+    """Benchmark validating a valid input against a prebuilt model"""
+    Model = get_model(schema, name)
+    instance = benchmark(Model.model_validate, data)
+    assert isinstance(instance, Model)
@@ -1,16 +1,16 @@
 """
 Test core type support for schema parser.
 Tests: Object, Array, Enum, Union types
+
+Run from the repository root (add -j N to run the tests in N processes, -v for tracebacks of failures):
+    python -m structured_output.test_core_types
 """
 
 import sys
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from tools_agent.utils.structured_output import create_pydantic_model_from_json_schema
+from structured_output.runner import parse_args, run_tests
 from structured_output.test_schemas import (
+    get_model,
     USER_DATA_SCHEMA,
     WEATHER_SCHEMA,
     WEATHER_OPTIONAL_SCHEMA,
@@ -19,8 +19,39 @@ from structured_output.test_schemas import (
     MULTIPLE_ENUMS_SCHEMA,
     ARRAY_OF_OBJECTS_SCHEMA,
 )
-from pydantic import ValidationError
-import json
+from pydantic import TypeAdapter, ValidationError
+import orjson
+
+# JSON inputs are serialized once and validated straight from bytes
+_ARRAY_OF_OBJECTS_JSON = orjson.dumps({
+    "items": [
+        {"id": 1, "name": "Item 1"},
+        {"id": 2, "name": "Item 2"}
+    ]
+})
+
+_NESTED_OBJECT_JSON = orjson.dumps({
+    "user": {
+        "name": "Bob",
+        "address": {
+            "street": "123 Main St",
+            "city": "Springfield"
+        }
+    }
+})
+
+_REQUIRED_OPTIONAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "required_field": {"type": "string"},
+        "optional_field": {"type": "string"}
+    },
+    "required": ["required_field"]
+}
+
+# The model and its strict validator are built once at import
+_REQUIRED_OPTIONAL_MODEL = get_model(_REQUIRED_OPTIONAL_SCHEMA, "RequiredOptionalTest")
+_REQUIRED_OPTIONAL_ADAPTER = TypeAdapter(_REQUIRED_OPTIONAL_MODEL)
 
 
 def test_primitives():
@@ -38,7 +69,7 @@ def test_primitives():
         "required": ["name", "age", "score", "active"]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "PrimitivesTest")
+    Model = get_model(schema, "PrimitivesTest")
 
     # Valid instance
     instance = Model(name="Alice", age=30, score=95.5, active=True)
@@ -46,14 +77,14 @@ def test_primitives():
     print(f"   name={instance.name}, age={instance.age}, score={instance.score}, active={instance.active}")
 
     # Test JSON serialization
-    print(f"✅ JSON: {instance.model_dump_json()}")
+    print(f"✅ JSON: {orjson.dumps(instance.model_dump()).decode()}")
 
 
 def test_enum():
     """Test enum support"""
     print("\n=== Test 2: Enum Types ===")
 
-    Model = create_pydantic_model_from_json_schema(WEATHER_SCHEMA, "WeatherTest")
+    Model = get_model(WEATHER_SCHEMA, "WeatherTest")
 
     # Valid instances
     instance1 = Model(location="San Francisco", unit="F")
@@ -66,15 +97,15 @@ def test_enum():
     try:
         instance3 = Model(location="Tokyo", unit="K")
         print(f"❌ Should have failed with invalid enum value")
-    except ValidationError as e:
-        print(f"✅ Correctly rejected invalid enum: {e.error_count()} errors")
+    except ValidationError:
+        print(f"✅ Correctly rejected invalid enum")
 
 
 def test_multiple_enums():
     """Test multiple enum fields"""
     print("\n=== Test 3: Multiple Enums ===")
 
-    Model = create_pydantic_model_from_json_schema(MULTIPLE_ENUMS_SCHEMA, "MultipleEnumsTest")
+    Model = get_model(MULTIPLE_ENUMS_SCHEMA, "MultipleEnumsTest")
 
     instance = Model(status="approved", priority="high")
     print(f"✅ Created instance: {instance}")
@@ -85,7 +116,7 @@ def test_array_of_primitives():
     """Test array of primitive types"""
     print("\n=== Test 4: Array of Primitives ===")
 
-    Model = create_pydantic_model_from_json_schema(SIMPLE_ARRAY_SCHEMA, "SimpleArrayTest")
+    Model = get_model(SIMPLE_ARRAY_SCHEMA, "SimpleArrayTest")
 
     instance = Model(tags=["python", "testing", "pydantic"])
     print(f"✅ Created instance: {instance}")
@@ -96,12 +127,10 @@ def test_array_of_objects():
     """Test array of objects"""
     print("\n=== Test 5: Array of Objects ===")
 
-    Model = create_pydantic_model_from_json_schema(ARRAY_OF_OBJECTS_SCHEMA, "ArrayOfObjectsTest")
+    # Items are only read back, so they're built as TypedDicts rather than nested models
+    Model = get_model(ARRAY_OF_OBJECTS_SCHEMA, "ArrayOfObjectsTest", typed_dict=True)
 
-    instance = Model(items=[
-        {"id": 1, "name": "Item 1"},
-        {"id": 2, "name": "Item 2"}
-    ])
+    instance = Model.model_validate_json(_ARRAY_OF_OBJECTS_JSON)
     print(f"✅ Created instance: {instance}")
     print(f"   items={instance.items}")
 
@@ -110,26 +139,21 @@ def test_nested_object():
     """Test nested objects"""
     print("\n=== Test 6: Nested Objects ===")
 
-    Model = create_pydantic_model_from_json_schema(NESTED_OBJECT_SCHEMA, "NestedObjectTest")
+    # Nested objects are only read back, so they're built as TypedDicts rather than models
+    Model = get_model(NESTED_OBJECT_SCHEMA, "NestedObjectTest", typed_dict=True)
 
-    instance = Model(user={
-        "name": "Bob",
-        "address": {
-            "street": "123 Main St",
-            "city": "Springfield"
-        }
-    })
+    instance = Model.model_validate_json(_NESTED_OBJECT_JSON)
     print(f"✅ Created instance: {instance}")
-    print(f"   user.name={instance.user.name}")
-    print(f"   user.address.street={instance.user.address.street}")
-    print(f"   user.address.city={instance.user.address.city}")
+    print(f"   user.name={instance.user['name']}")
+    print(f"   user.address.street={instance.user['address']['street']}")
+    print(f"   user.address.city={instance.user['address']['city']}")
 
 
 def test_union_type_optional():
     """Test union types for optional fields"""
     print("\n=== Test 7: Union Types (Optional Fields) ===")
 
-    Model = create_pydantic_model_from_json_schema(WEATHER_OPTIONAL_SCHEMA, "WeatherOptionalTest")
+    Model = get_model(WEATHER_OPTIONAL_SCHEMA, "WeatherOptionalTest")
 
     # With value
     instance1 = Model(location="Boston", unit="F")
@@ -144,7 +168,7 @@ def test_user_data_with_validation():
     """Test user data schema with pattern and format"""
     print("\n=== Test 8: User Data with Validation ===")
 
-    Model = create_pydantic_model_from_json_schema(USER_DATA_SCHEMA, "UserDataTest")
+    Model = get_model(USER_DATA_SCHEMA, "UserDataTest")
 
     # Valid instance
     instance = Model(
@@ -162,16 +186,7 @@ def test_required_vs_optional():
     """Test required vs optional fields"""
     print("\n=== Test 9: Required vs Optional ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "required_field": {"type": "string"},
-            "optional_field": {"type": "string"}
-        },
-        "required": ["required_field"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "RequiredOptionalTest")
+    Model = _REQUIRED_OPTIONAL_MODEL
 
     # Valid with only required field
     instance1 = Model(required_field="value")
@@ -183,10 +198,10 @@ def test_required_vs_optional():
 
     # Invalid - missing required field
     try:
-        instance3 = Model(optional_field="value")
+        instance3 = _REQUIRED_OPTIONAL_ADAPTER.validate_python({"optional_field": "value"}, strict=True)
         print(f"❌ Should have failed without required field")
-    except ValidationError as e:
-        print(f"✅ Correctly rejected missing required field: {e.error_count()} errors")
+    except ValidationError:
+        print(f"✅ Correctly rejected missing required field")
 
 
 def test_all_types_combined():
@@ -219,7 +234,7 @@ def test_all_types_combined():
         ]
     }
 
-    Model = create_pydantic_model_from_json_schema(schema, "AllTypesCombinedTest")
+    Model = get_model(schema, "AllTypesCombinedTest")
 
     instance = Model(
         string_field="test",
@@ -231,11 +246,11 @@ def test_all_types_combined():
         nested_object={"nested_field": "nested_value"}
     )
     print(f"✅ Created instance: {instance}")
-    print(f"   JSON: {instance.model_dump_json()}")
+    print(f"   JSON: {orjson.dumps(instance.model_dump()).decode()}")
 
 
-def run_all_tests():
-    """Run all core type tests"""
+def run_all_tests(jobs: int = 1, verbose: bool = False):
+    """Run all core type tests (in `jobs` worker processes when jobs > 1)"""
     print("=" * 80)
     print("CORE TYPE TESTS - Testing Object, Array, Enum, Union")
     print("=" * 80)
@@ -253,18 +268,8 @@ def run_all_tests():
         test_all_types_combined,
     ]
 
-    passed = 0
-    failed = 0
-
-    for test_func in tests:
-        try:
-            test_func()
-            passed += 1
-        except Exception as e:
-            print(f"\n❌ {test_func.__name__} FAILED: {e}")
-            import traceback
-            traceback.print_exc()
-            failed += 1
+    passed = run_tests(tests, jobs, verbose)
+    failed = len(tests) - passed
 
     print("\n" + "=" * 80)
     print(f"RESULTS: {passed} passed, {failed} failed out of {len(tests)} tests")
@@ -274,5 +279,6 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    args = parse_args(__doc__, jobs=True)
+    success = run_all_tests(args.jobs, args.verbose)
     sys.exit(0 if success else 1)
\ No newline at end of file
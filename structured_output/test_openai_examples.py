@@ -1,16 +1,16 @@
 """
 Test all 7 OpenAI documentation examples.
 Each test corresponds to a specific example from the OpenAI docs.
+
+Run from the repository root (add -j N to run the tests in N processes, -v for tracebacks of failures):
+    python -m structured_output.test_openai_examples
 """
 
 import sys
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from tools_agent.utils.structured_output import create_pydantic_model_from_json_schema
+from structured_output.runner import parse_args, run_tests
 from structured_output.test_schemas import (
+    get_model,
     USER_DATA_SCHEMA,
     WEATHER_SCHEMA,
     WEATHER_OPTIONAL_SCHEMA,
@@ -19,6 +19,36 @@ from structured_output.test_schemas import (
     RECURSIVE_UI_SCHEMA,
     RECURSIVE_LINKED_LIST_SCHEMA,
 )
+import orjson
+from pydantic import TypeAdapter
+
+# JSON inputs are serialized once and validated straight from bytes
+_STEPS_JSON = orjson.dumps({
+    "steps": [
+        {"explanation": "Parse the input", "output": "tokens: [...]"},
+        {"explanation": "Analyze structure", "output": "AST: {...}"},
+        {"explanation": "Execute logic", "output": "result: 42"}
+    ],
+    "final_answer": "42"
+})
+
+# Linked list: 10 -> 20 -> 30 -> null
+_LINKED_LIST_JSON = orjson.dumps({
+    "linked_list": {
+        "value": 10,
+        "next": {
+            "value": 20,
+            "next": {
+                "value": 30,
+                "next": None
+            }
+        }
+    }
+})
+
+# The recursive model and its validator are built once at import
+_LL_MODEL = get_model(RECURSIVE_LINKED_LIST_SCHEMA, "LinkedListContainer")
+_LL_ADAPTER = TypeAdapter(_LL_MODEL)
 
 
 def test_example_1_user_data():
@@ -29,7 +59,7 @@ def test_example_1_user_data():
     print("\n=== Example 1: User Data Schema ===")
     print("Source: OpenAI docs lines 52-78")
 
-    Model = create_pydantic_model_from_json_schema(USER_DATA_SCHEMA, "UserData")
+    Model = get_model(USER_DATA_SCHEMA, "UserData")
 
     # Valid instance
     instance = Model(
@@ -59,7 +89,7 @@ def test_example_2_weather_enum():
     print("\n=== Example 2: Weather Schema with Enum ===")
     print("Source: OpenAI docs lines 103-123")
 
-    Model = create_pydantic_model_from_json_schema(WEATHER_SCHEMA, "Weather")
+    Model = get_model(WEATHER_SCHEMA, "Weather")
 
     # Valid instances
     instance1 = Model(location="San Francisco", unit="F")
@@ -84,7 +114,7 @@ def test_example_3_optional_union():
     print("\n=== Example 3: Weather with Optional Unit ===")
     print("Source: OpenAI docs lines 127-149")
 
-    Model = create_pydantic_model_from_json_schema(WEATHER_OPTIONAL_SCHEMA, "WeatherOptional")
+    Model = get_model(WEATHER_OPTIONAL_SCHEMA, "WeatherOptional")
 
     # With unit
     instance1 = Model(location="Boston", unit="F")
@@ -103,7 +133,7 @@ def test_example_4_anyof_discriminated_union():
     print("\n=== Example 4: anyOf with User/Address ===")
     print("Source: OpenAI docs lines 211-266")
 
-    Model = create_pydantic_model_from_json_schema(ANYOF_USER_ADDRESS_SCHEMA, "UserOrAddress")
+    Model = get_model(ANYOF_USER_ADDRESS_SCHEMA, "UserOrAddress")
 
     # User variant
     user_instance = Model(item={"name": "Alice Smith", "age": 28})
@@ -126,17 +156,10 @@ def test_example_5_definitions():
     print("\n=== Example 5: Schema with $defs ===")
     print("Source: OpenAI docs lines 272-308")
 
-    Model = create_pydantic_model_from_json_schema(DEFINITIONS_SCHEMA, "StepsResponse")
+    Model = get_model(DEFINITIONS_SCHEMA, "StepsResponse")
 
     # Create instance with reasoning steps
-    instance = Model(
-        steps=[
-            {"explanation": "Parse the input", "output": "tokens: [...]"},
-            {"explanation": "Analyze structure", "output": "AST: {...}"},
-            {"explanation": "Execute logic", "output": "result: 42"}
-        ],
-        final_answer="42"
-    )
+    instance = Model.model_validate_json(_STEPS_JSON)
 
     print(f"✅ Created response with {len(instance.steps)} steps")
     print(f"   Final answer: {instance.final_answer}")
@@ -154,7 +177,7 @@ def test_example_6_recursive_ui():
     print("Source: OpenAI docs lines 314-360")
 
     try:
-        Model = create_pydantic_model_from_json_schema(RECURSIVE_UI_SCHEMA, "UIComponent")
+        Model = get_model(RECURSIVE_UI_SCHEMA, "UIComponent")
 
         # Simple component
         instance = Model(
@@ -181,19 +204,7 @@ def test_example_7_recursive_linked_list():
     print("\n=== Example 7: Recursive Linked List ===")
     print("Source: OpenAI docs lines 364-400")
 
-    Model = create_pydantic_model_from_json_schema(RECURSIVE_LINKED_LIST_SCHEMA, "LinkedListContainer")
-
-    # Create linked list: 10 -> 20 -> 30 -> null
-    instance = Model(linked_list={
-        "value": 10,
-        "next": {
-            "value": 20,
-            "next": {
-                "value": 30,
-                "next": None
-            }
-        }
-    })
+    instance = _LL_ADAPTER.validate_json(_LINKED_LIST_JSON)
 
     print(f"✅ Created linked list:")
     print(f"   Node 1: {instance.linked_list.value}")
@@ -202,8 +213,8 @@ def test_example_7_recursive_linked_list():
     print(f"   Tail: {instance.linked_list.next.next.next}")
 
 
-def run_all_tests():
-    """Run all 7 OpenAI documentation examples"""
+def run_all_tests(jobs: int = 1, verbose: bool = False):
+    """Run all 7 OpenAI documentation examples (in `jobs` worker processes when jobs > 1)"""
     print("=" * 80)
     print("OPENAI DOCUMENTATION EXAMPLES - All 7 Examples")
     print("=" * 80)
@@ -218,18 +229,8 @@ def run_all_tests():
         test_example_7_recursive_linked_list,
     ]
 
-    passed = 0
-    failed = 0
-
-    for test_func in tests:
-        try:
-            test_func()
-            passed += 1
-        except Exception as e:
-            print(f"\n❌ {test_func.__name__} FAILED: {e}")
-            import traceback
-            traceback.print_exc()
-            failed += 1
+    passed = run_tests(tests, jobs, verbose)
+    failed = len(tests) - passed
 
     print("\n" + "=" * 80)
     print(f"RESULTS: {passed} passed, {failed} failed out of {len(tests)} tests")
@@ -244,5 +245,6 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    args = parse_args(__doc__, jobs=True)
+    success = run_all_tests(args.jobs, args.verbose)
     sys.exit(0 if success else 1)
\ No newline at end of file
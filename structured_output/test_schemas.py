@@ -3,6 +3,32 @@ Test schemas based on OpenAI Structured Output documentation.
 Source: https://platform.openai.com/docs/guides/structured-outputs#supported-schemas
 """
 
+from tools_agent.utils.structured_output import create_pydantic_model_from_json_schema
+
+# Fragments shared by several schemas below (the parser never mutates its input)
+_STRING = {"type": "string"}
+
+_LOCATION = {
+    "type": "string",
+    "description": "The location to get the weather for"
+}
+
+_NAME_VALUE_OBJ = {
+    "type": "object",
+    "properties": {
+        "name": {
+            "type": "string",
+            "description": "The name of the attribute, for example onClick or className"
+        },
+        "value": {
+            "type": "string",
+            "description": "The value of the attribute"
+        }
+    },
+    "additionalProperties": False,
+    "required": ["name", "value"]
+}
+
 # Example 1: User data with pattern and format validation (lines 52-78)
 USER_DATA_SCHEMA = {
     "type": "object",
@@ -30,10 +56,7 @@ USER_DATA_SCHEMA = {
 WEATHER_SCHEMA = {
     "type": "object",
     "properties": {
-        "location": {
-            "type": "string",
-            "description": "The location to get the weather for"
-        },
+        "location": _LOCATION,
         "unit": {
             "type": "string",
             "description": "The unit to return the temperature in",
@@ -48,10 +71,7 @@ WEATHER_SCHEMA = {
 WEATHER_OPTIONAL_SCHEMA = {
     "type": "object",
     "properties": {
-        "location": {
-            "type": "string",
-            "description": "The location to get the weather for"
-        },
+        "location": _LOCATION,
         "unit": {
             "type": ["string", "null"],
             "description": "The unit to return the temperature in",
@@ -121,20 +141,14 @@ DEFINITIONS_SCHEMA = {
                 "$ref": "#/$defs/step"
             }
         },
-        "final_answer": {
-            "type": "string"
-        }
+        "final_answer": _STRING
     },
     "$defs": {
         "step": {
             "type": "object",
             "properties": {
-                "explanation": {
-                    "type": "string"
-                },
-                "output": {
-                    "type": "string"
-                }
+                "explanation": _STRING,
+                "output": _STRING
             },
             "required": ["explanation", "output"],
             "additionalProperties": False
@@ -167,21 +181,7 @@ RECURSIVE_UI_SCHEMA = {
         "attributes": {
             "type": "array",
             "description": "Arbitrary attributes for the UI component, suitable for any element",
-            "items": {
-                "type": "object",
-                "properties": {
-                    "name": {
-                        "type": "string",
-                        "description": "The name of the attribute, for example onClick or className"
-                    },
-                    "value": {
-                        "type": "string",
-                        "description": "The value of the attribute"
-                    }
-                },
-                "additionalProperties": False,
-                "required": ["name", "value"]
-            }
+            "items": _NAME_VALUE_OBJ
         }
     },
     "required": ["type", "label", "children", "attributes"],
@@ -230,9 +230,7 @@ SIMPLE_ARRAY_SCHEMA = {
     "properties": {
         "tags": {
             "type": "array",
-            "items": {
-                "type": "string"
-            },
+            "items": _STRING,
             "minItems": 1,
             "maxItems": 10
         }
@@ -248,18 +246,12 @@ NESTED_OBJECT_SCHEMA = {
         "user": {
             "type": "object",
             "properties": {
-                "name": {
-                    "type": "string"
-                },
+                "name": _STRING,
                 "address": {
                     "type": "object",
                     "properties": {
-                        "street": {
-                            "type": "string"
-                        },
-                        "city": {
-                            "type": "string"
-                        }
+                        "street": _STRING,
+                        "city": _STRING
                     },
                     "required": ["street", "city"],
                     "additionalProperties": False
@@ -346,9 +338,7 @@ ARRAY_OF_OBJECTS_SCHEMA = {
                     "id": {
                         "type": "integer"
                     },
-                    "name": {
-                        "type": "string"
-                    }
+                    "name": _STRING
                 },
                 "required": ["id", "name"],
                 "additionalProperties": False
@@ -375,4 +365,10 @@ ALL_SCHEMAS = {
     "STRING_FORMAT_SCHEMA": STRING_FORMAT_SCHEMA,
     "MULTIPLE_ENUMS_SCHEMA": MULTIPLE_ENUMS_SCHEMA,
     "ARRAY_OF_OBJECTS_SCHEMA": ARRAY_OF_OBJECTS_SCHEMA,
-}
\ No newline at end of file
+}
+
+
+def get_model(schema: dict, name: str, typed_dict: bool = False):
+    """Get the Pydantic model for a JSON schema, shared by every test module that asks for it"""
+    # The library's bounded LRU already returns the same model for the same schema and name
+    return create_pydantic_model_from_json_schema(schema, name, typed_dict=typed_dict, defer_build=True)
@@ -0,0 +1,116 @@
+"""
+Test the agent's bounded LangGraph memory store.
+Tests: per-namespace eviction through batch and abatch, deletes, exempt namespaces
+
+Run from the repository root (add -v for tracebacks of failures):
+    python -m structured_output.test_store
+"""
+
+import asyncio
+import sys
+
+from structured_output.runner import parse_args, run_tests
+from tools_agent.agent import _BoundedInMemoryStore
+
+NAMESPACE = ("user", "memories")
+
+
+def _keys(store: _BoundedInMemoryStore, namespace: tuple[str, ...] = NAMESPACE) -> set[str]:
+    return {item.key for item in store.search(namespace, limit=100)}
+
+
+def test_batch_evicts_least_recently_written():
+    """Test that sync puts past the cap evict the least recently written key"""
+    print("\n=== Test 1: Eviction Through batch ===")
+
+    store = _BoundedInMemoryStore(max_items_per_namespace=2)
+    store.put(NAMESPACE, "a", {"n": 1})
+    store.put(NAMESPACE, "b", {"n": 2})
+    # Rewriting a makes b the least recently written
+    store.put(NAMESPACE, "a", {"n": 3})
+    store.put(NAMESPACE, "c", {"n": 4})
+
+    assert _keys(store) == {"a", "c"}, _keys(store)
+    assert store.get(NAMESPACE, "a").value == {"n": 3}
+    print(f"✅ Evicted b, kept {sorted(_keys(store))}")
+
+
+def test_abatch_evicts_least_recently_written():
+    """Test that async puts past the cap evict the same way (abatch doesn't go through batch)"""
+    print("\n=== Test 2: Eviction Through abatch ===")
+
+    store = _BoundedInMemoryStore(max_items_per_namespace=2)
+
+    async def write():
+        await store.aput(NAMESPACE, "a", {"n": 1})
+        await store.aput(NAMESPACE, "b", {"n": 2})
+        await store.aput(NAMESPACE, "a", {"n": 3})
+        await store.aput(NAMESPACE, "c", {"n": 4})
+
+    asyncio.run(write())
+
+    assert _keys(store) == {"a", "c"}, _keys(store)
+    print(f"✅ Evicted b, kept {sorted(_keys(store))}")
+
+
+def test_delete_frees_a_slot():
+    """Test that deleting a key (sync or async) makes room without evicting another"""
+    print("\n=== Test 3: Deletes ===")
+
+    store = _BoundedInMemoryStore(max_items_per_namespace=2)
+    store.put(NAMESPACE, "a", {"n": 1})
+    store.put(NAMESPACE, "b", {"n": 2})
+    store.delete(NAMESPACE, "a")
+    store.put(NAMESPACE, "c", {"n": 3})
+    assert _keys(store) == {"b", "c"}, _keys(store)
+
+    asyncio.run(store.adelete(NAMESPACE, "b"))
+    store.put(NAMESPACE, "d", {"n": 4})
+    assert _keys(store) == {"c", "d"}, _keys(store)
+    print(f"✅ Deleted keys freed their slots: {sorted(_keys(store))}")
+
+
+def test_namespaces_bounded_separately():
+    """Test that each namespace has its own cap and schema/token namespaces are never evicted"""
+    print("\n=== Test 4: Namespaces ===")
+
+    store = _BoundedInMemoryStore(max_items_per_namespace=1)
+    other = ("other", "memories")
+    schemas = ("user", "schemas")
+    for key in ("a", "b"):
+        store.put(NAMESPACE, key, {"key": key})
+        store.put(other, key, {"key": key})
+        store.put(schemas, key, {"type": "object"})
+
+    assert _keys(store) == {"b"}, _keys(store)
+    assert _keys(store, other) == {"b"}, _keys(store, other)
+    assert _keys(store, schemas) == {"a", "b"}, _keys(store, schemas)
+    print(f"✅ Each namespace capped on its own; schemas kept: {sorted(_keys(store, schemas))}")
+
+
+def run_all_tests(verbose: bool = False):
+    """Run all bounded store tests"""
+    print("=" * 80)
+    print("BOUNDED STORE TESTS")
+    print("=" * 80)
+
+    tests = [
+        test_batch_evicts_least_recently_written,
+        test_abatch_evicts_least_recently_written,
+        test_delete_frees_a_slot,
+        test_namespaces_bounded_separately,
+    ]
+
+    passed = run_tests(tests, verbose=verbose)
+    failed = len(tests) - passed
+
+    print("\n" + "=" * 80)
+    print(f"RESULTS: {passed} passed, {failed} failed out of {len(tests)} tests")
+    print("=" * 80)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = run_all_tests(parse_args(__doc__).verbose)
+    sys.exit(0 if success else 1)
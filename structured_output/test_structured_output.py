@@ -1,15 +1,28 @@
 """
 Test script for structured output feature using remote agent authentication.
 This script follows the authentication pattern from the external access POC.
+
+Run from the repository root (add -v for tracebacks of failures, --cache to reuse passing responses):
+    python -m structured_output.test_structured_output
 """
 
+import contextlib
+import io
 import os
+import sys
+import time
 import asyncio
 import uuid
 import json
-from supabase import create_client, Client
+from hashlib import blake2b
+from pathlib import Path
+
+import orjson
 from dotenv import load_dotenv
-from langgraph.pregel.remote import RemoteGraph
+
+from structured_output.auth import token_claims
+from structured_output.cases import TEST_CASES
+from structured_output.runner import format_failure
 
 # Load environment variables
 load_dotenv()
@@ -23,57 +36,57 @@ USER_PASSWORD = os.environ.get("USER_PASSWORD")
 # Agent configuration
 AGENT_URL = "http://localhost:2024"  # Local development server
 ASSISTANT_ID = "agent"  # Default assistant ID for local development
+MAX_CONCURRENT_CASES = 10  # Test cases are independent, so this many run at once
 
-# Test data for comprehensive OpenAI spec coverage
-
-# Test recipe for allergy analysis (Schema 8)
-FRESHPREP_TEST_RECIPE = """
-Pulled Chicken Fajitas
-with Chipotle-Pineapple Sauce & Cheddar
-Poultry - Local, Free Run, Antibiotic Free
-Milk
-Gluten
-Seafood
-Serves
-2
-Difficulty
-Moderate
-Time
-30 Min
-Ingredients
-Onion
-Chipotle Pepper in Adobo Sauce
-Chicken Breast
-Worcestershire Sauce
-Aged White Cheddar Cheese
-Flour Tortillas 6"
-Cilantro
-Assorted Mini Bell Peppers
-Coconut Sugar
-Green Cabbage
-Pineapple-Lime Juice
-Spice Blend
-Lime Crema
-* Pineapple-Lime Juice: Pineapple Juice , Fresh Lime Juice
-* Spice Blend: Smoked Paprika , Cumin
-* Lime Crema: Sour Cream , Mayonnaise , Fresh Lime Juice
-"""
+# Access tokens are reused across runs until they are this close to expiring
+TOKEN_CACHE_PATH = Path.home() / ".cache" / "oap_token.json"
+TOKEN_REFRESH_MARGIN = 60  # seconds
 
-# Test recipe for nutrition analysis (Schema 1)
-SALMON_QUINOA_RECIPE = """
-Grilled Salmon with Quinoa and Roasted Vegetables
-- Grilled Salmon (6oz Atlantic salmon fillet)
-- Quinoa (1 cup cooked)
-- Roasted Broccoli (1 cup florets)
-- Olive Oil (2 tbsp for cooking)
-- Lemon (1 wedge)
-- Garlic and Herbs seasoning
-Serves: 2 people
-Estimated prep time: 30 minutes
-"""
+# With --cache (or OAP_TEST_CACHE=1), passing responses are reused on later runs against the
+# same agent source; clear them with `rm -r ~/.cache/oap_tests`
+RESPONSE_CACHE_DIR = Path.home() / ".cache" / "oap_tests"
+AGENT_SOURCE_DIR = Path(__file__).resolve().parent.parent / "tools_agent"
+
+
+def _agent_source_digest() -> str:
+    """Digest of the agent's Python sources, so cached responses go stale when the agent changes"""
+    digest = blake2b(digest_size=16)
+    for path in sorted(AGENT_SOURCE_DIR.rglob("*.py")):
+        digest.update(str(path.relative_to(AGENT_SOURCE_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+_SEP = "=" * 80
+SUMMARY_TEMPLATE = (
+    f"\n{_SEP}\nTEST SUMMARY\n{_SEP}\n"
+    "Total tests: {total}\nPassed: {passed}\nFailed: {failed}\n\n{verdict}\n"
+    f"{_SEP}\n"
+)
+
+def _load_cached_token():
+    """Return the cached (access_token, user_id) for USER_EMAIL if it is not about to expire"""
+    try:
+        cached = json.loads(TOKEN_CACHE_PATH.read_text())
+        if cached.get("email") != USER_EMAIL or cached.get("url") != SUPABASE_URL:
+            return None
+        access_token = cached["access_token"]
+        user_id = cached["user_id"]
+        if token_claims(access_token)["exp"] - time.time() < TOKEN_REFRESH_MARGIN:
+            return None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        # A missing, truncated or hand-edited cache file is a miss, so log in again
+        return None
+    return access_token, user_id
+
+def _save_cached_token(access_token: str, user_id: str):
+    """Persist the token for later runs, readable only by the current user"""
+    TOKEN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(TOKEN_CACHE_PATH, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"email": USER_EMAIL, "url": SUPABASE_URL, "access_token": access_token, "user_id": user_id}, f)
 
 def authenticate_supabase():
-    """Authenticate with Supabase and return access token and user info"""
+    """Authenticate with Supabase and return access token and user info (reusing a cached token)"""
     print(f"SUPABASE_URL: {SUPABASE_URL}")
     print(f"SUPABASE_KEY: {'***' if SUPABASE_KEY else 'None'}")
     print(f"USER_EMAIL: {USER_EMAIL}")
@@ -85,6 +98,14 @@ def authenticate_supabase():
     if not USER_EMAIL or not USER_PASSWORD:
         raise ValueError("user_email and user_password must be set in .env file")
 
+    cached = _load_cached_token()
+    if cached:
+        print(f"Authenticated user_id: {cached[1]} (cached token)")
+        return cached
+
+    # Imported here so runs with a cached token never load the Supabase client
+    from supabase import create_client, Client
+
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
     response = supabase.auth.sign_in_with_password({
@@ -92,17 +113,38 @@ def authenticate_supabase():
         "password": USER_PASSWORD,
     })
 
-    # Get user info to extract user_id (same as schema_loader.py)
+    # The user id is the token's subject claim (same as schema_loader.py); Supabase just
+    # issued the token, so there is no need to verify it or ask get_user
     access_token = response.session.access_token
-    user_response = supabase.auth.get_user(access_token)
-    user_id = user_response.user.id
+    user_id = token_claims(access_token)["sub"]
 
     print(f"Authenticated user_id: {user_id}")
 
+    _save_cached_token(access_token, user_id)
     return access_token, user_id
 
-async def test_structured_output():
-    """Test the structured output feature with different schemas"""
+def _response_cache_path(test_case, agent_digest: str) -> Path:
+    """Cache file for a test case's response, keyed by agent (and its source), user, schema and input"""
+    configurable = test_case["config"]["configurable"]
+    key = orjson.dumps([
+        agent_digest,
+        AGENT_URL,
+        ASSISTANT_ID,
+        configurable.get("user_id"),
+        configurable.get("OutputSchemaName"),
+        test_case["payload"],
+    ])
+    return RESPONSE_CACHE_DIR / f"{blake2b(key, digest_size=16).hexdigest()}.json"
+
+async def test_structured_output(cases=TEST_CASES, verbose: bool = False, reuse_thread: bool = False, use_cache: bool = False):
+    """
+    Test the structured output feature with different schemas (see cases.py).
+
+    Tracebacks are printed only when verbose. With reuse_thread, cases that share a schema
+    share a thread, trading isolation for server-side reuse; runs on one thread go in turn.
+    With use_cache, passing responses are saved under RESPONSE_CACHE_DIR and served from
+    there on later runs until the agent's source changes.
+    """
 
     # Authenticate and get access token and user_id
     access_token, user_id = authenticate_supabase()
@@ -113,83 +155,37 @@ async def test_structured_output():
         "Authorization": f"Bearer {access_token}",
     }
 
-    # Create remote graph connection
-    remote_graph = RemoteGraph(
-        ASSISTANT_ID,
-        url=AGENT_URL,
-        headers=headers
-    )
-
-    # Comprehensive test cases covering all OpenAI Structured Output features
-    test_cases = [
-        {
-            "name": "Test 0: No Schema (Baseline)",
-            "schema": None,
-            "prompt": "What is 2 + 3?",
-            "description": "Baseline test without structured output"
-        },
-        {
-            "name": "Test 1: RecipeNutritionAnalysis (Number Constraints)",
-            "schema": "RecipeNutritionAnalysis",
-            "prompt": f"Analyze the nutritional content of this recipe:\n\n{SALMON_QUINOA_RECIPE}\n\nProvide calories, protein/fat/carbs in grams, number of servings, and prep time (round to nearest 5 minutes).",
-            "description": "Tests: min/max, ge/le, multipleOf constraints"
-        },
-        {
-            "name": "Test 2: IngredientClassification (Enums & Arrays)",
-            "schema": "IngredientClassification",
-            "prompt": "Classify this ingredient: Organic Almond Butter. Provide the ingredient name, categorize it (protein/grain/vegetable/fruit/dairy/condiment/spice), identify which dietary restrictions it fits (vegan/vegetarian/gluten-free/dairy-free/nut-free/kosher/halal), and list any allergen tags (max 5).",
-            "description": "Tests: enum, array of enums, minItems/maxItems"
-        },
-        {
-            "name": "Test 3: FoodSafetyReport ($defs & $ref)",
-            "schema": "FoodSafetyReport",
-            "prompt": "Generate a food safety inspection report for a commercial kitchen inspected on 2025-03-15. Inspection ID: INS-2025-0315. Found violations: 1) Improper food storage temperature in walk-in cooler (critical severity), corrective action: adjust thermostat and monitor; 2) Missing handwashing signage near prep area (minor severity), corrective action: install signage; 3) Expired ingredients in dry storage (major severity), corrective action: dispose and update inventory system. Calculate an overall safety score (0-100).",
-            "description": "Tests: nested objects with $ref, array of complex objects"
-        },
-        {
-            "name": "Test 4: MenuPlanning (Complex Nested Objects)",
-            "schema": "MenuPlanning",
-            "prompt": "Create a 3-day meal plan for a small restaurant starting Monday, April 1, 2025. Each day needs breakfast, lunch, and dinner. For each meal, provide dish name, main ingredients (list), and estimated cost per serving. Use a 'Spring Fresh' theme focusing on seasonal vegetables and local proteins.",
-            "description": "Tests: deeply nested objects, array of complex nested structures"
-        },
-        {
-            "name": "Test 5: RecipeInstructions (Recursive Schema)",
-            "schema": "RecipeInstructions",
-            "prompt": "Provide step-by-step instructions for making Homemade Sourdough Bread. Include the recipe name and total time. Break down into main steps, and for complex steps like 'Prepare the dough' or 'Shape and proof', include sub-steps. Each step should have a step number, instruction text, and duration in minutes.",
-            "description": "Tests: recursive schemas, self-referencing structures"
-        },
-        {
-            "name": "Test 6: SupplierQuote (Union Types & Pattern Validation)",
-            "schema": "SupplierQuote",
-            "prompt": "Generate a supplier quote: Supplier name is 'Fresh Farms Co.', contact email john.smith@freshfarms.com, phone number (555) 123-4567, quoting $450.00 for organic produce delivery. Expected delivery date is 2025-04-15. Add optional notes about requiring refrigerated transport.",
-            "description": "Tests: pattern validation (email, phone, date), union with null"
-        },
-        {
-            "name": "Test 7: QualityInspection (Multiple Enums & Format Validation)",
-            "schema": "QualityInspection",
-            "prompt": "Create a quality control inspection record: Batch ID BT-2025-0315 for processed tomatoes. Inspector email: qa.inspector@foodco.com. Inspection datetime: 2025-03-15T14:30:00. Assign a quality grade (A/B/C/D/F), set status (pending/approved/rejected/review_required), and list inspection findings such as color consistency, texture, no defects found.",
-            "description": "Tests: multiple enums, format validation (email, date-time), pattern (batch ID)"
-        },
-        {
-            "name": "Test 8: AllergyAnalysisResponse (Keep Existing)",
-            "schema": "AllergyAnalysisResponse",
-            "prompt": f"Analyze this recipe for food allergens:\n\n{FRESHPREP_TEST_RECIPE}\n\nIdentify high-risk allergens with reasons, and provide recommendations for people with allergies.",
-            "description": "Tests: array of nested objects (proven working)"
-        }
-    ]
+    import httpx
+    from langgraph.pregel.remote import RemoteGraph
+    from langgraph_sdk.client import LangGraphClient
+
+    # Create remote graph connection over one keep-alive pool shared by every test case
+    client = LangGraphClient(httpx.AsyncClient(
+        base_url=AGENT_URL,
+        headers=headers,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+        timeout=httpx.Timeout(connect=5, read=300, write=300, pool=5),
+    ))
+    remote_graph = RemoteGraph(ASSISTANT_ID, client=client)
 
     # Convert to old format for compatibility
     formatted_test_cases = []
-    for test in test_cases:
+    if reuse_thread:
+        bucket_ids = {}
+        thread_ids = [bucket_ids.setdefault(test["schema"], str(uuid.uuid4())) for test in cases]
+    else:
+        thread_ids = [str(uuid.uuid4()) for _ in cases]
+    for test, thread_id in zip(cases, thread_ids):
         case = {
             "name": test["name"],
             "config": {
                 "configurable": {
-                    "thread_id": str(uuid.uuid4()),
+                    "thread_id": thread_id,
                     "x-supabase-access-token": access_token,
                 }
             },
             "prompt": test["prompt"],
+            "payload": {"messages": [{"role": "user", "content": test["prompt"]}]},
             "description": test["description"]
         }
         if test["schema"]:
@@ -199,81 +195,116 @@ async def test_structured_output():
 
     test_cases = formatted_test_cases
 
-    # Run test cases
+    # Cached responses are only valid for the agent source they were produced by
+    agent_digest = _agent_source_digest() if use_cache else None
+
+    # Run test cases concurrently; a thread only takes one run at a time
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_CASES)
+    thread_locks = {thread_id: asyncio.Lock() for thread_id in thread_ids}
+
+    async def invoke(test_case):
+        cache_path = _response_cache_path(test_case, agent_digest) if use_cache else None
+        if cache_path and cache_path.exists():
+            return orjson.loads(cache_path.read_bytes())
+
+        # Stream state values so a schema case can stop as soon as its structured response lands
+        wants_structure = "OutputSchemaName" in test_case["config"]["configurable"]
+        async with thread_locks[test_case["config"]["configurable"]["thread_id"]], semaphore:
+            state = None
+            # aclosing shuts the stream (and its HTTP response) as soon as the loop breaks
+            stream = remote_graph.astream(test_case["payload"], config=test_case["config"], stream_mode="values")
+            async with contextlib.aclosing(stream):
+                async for state in stream:
+                    if wants_structure and state.get("structured_response"):
+                        break
+
+        # Only cache responses that pass, so failing cases are retried next run
+        if use_cache and state and (state.get("structured_response") or not wants_structure):
+            RESPONSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(orjson.dumps(state))
+        return state
+
+    print(f"Sending {len(test_cases)} requests to LangGraph agent...")
+    async with client:
+        results = await asyncio.gather(*(invoke(test_case) for test_case in test_cases), return_exceptions=True)
+
     passed = 0
     failed = 0
 
-    for i, test_case in enumerate(test_cases, 1):
-        print(f"\n{'='*80}")
-        print(f"{test_case['name']}")
-        print(f"Description: {test_case['description']}")
-        print(f"{'='*80}")
-
-        try:
-            # Invoke the graph
-            print(f"Sending request to LangGraph agent...")
-            result = await remote_graph.ainvoke({
-                "messages": [{"role": "user", "content": test_case["prompt"]}]
-            }, config=test_case["config"])
-
-            # Check if structured output is expected
-            schema_name = test_case["config"]["configurable"].get("OutputSchemaName")
-            if schema_name:
-                structured_response = result.get("structured_response")
-                if structured_response:
-                    print(f"\n✅ SUCCESS - Structured output received ({schema_name}):")
-                    print("-" * 80)
-                    # Pretty print if it's JSON
-                    try:
-                        if isinstance(structured_response, str):
-                            parsed = json.loads(structured_response)
-                            print(json.dumps(parsed, indent=2))
-                        else:
-                            print(json.dumps(structured_response, indent=2))
-                    except:
-                        print(structured_response)
-                    passed += 1
+    # Collect the report for every case and emit it with a single write
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        for test_case, result in zip(test_cases, results):
+            print(f"\n{'='*80}")
+            print(f"{test_case['name']}")
+            print(f"Description: {test_case['description']}")
+            print(f"{'='*80}")
+
+            try:
+                if isinstance(result, BaseException):
+                    raise result
+
+                # Check if structured output is expected
+                schema_name = test_case["config"]["configurable"].get("OutputSchemaName")
+                if schema_name:
+                    structured_response = result.get("structured_response")
+                    if structured_response:
+                        print(f"\n✅ SUCCESS - Structured output received ({schema_name}):")
+                        print("-" * 80)
+                        # Pretty print if it's JSON
+                        try:
+                            if isinstance(structured_response, str):
+                                parsed = orjson.loads(structured_response)
+                                print(orjson.dumps(parsed, option=orjson.OPT_INDENT_2).decode())
+                            else:
+                                print(orjson.dumps(structured_response, option=orjson.OPT_INDENT_2).decode())
+                        except:
+                            print(structured_response)
+                        passed += 1
+                    else:
+                        print(f"\n❌ FAILED - No structured response found")
+                        print("Text output received instead:")
+                        print(result["messages"][-1]["content"])
+                        failed += 1
                 else:
-                    print(f"\n❌ FAILED - No structured response found")
-                    print("Text output received instead:")
+                    print(f"\n✅ Text output (no schema expected):")
                     print(result["messages"][-1]["content"])
-                    failed += 1
-            else:
-                print(f"\n✅ Text output (no schema expected):")
-                print(result["messages"][-1]["content"])
-                passed += 1
-
-        except Exception as e:
-            print(f"\n❌ FAILED - Error in test case: {e}")
-            import traceback
-            traceback.print_exc()
-            failed += 1
+                    passed += 1
+
+            except Exception as e:
+                sys.stdout.write(format_failure(test_case["name"], e, verbose))
+                failed += 1
+
+    sys.stdout.write(buffer.getvalue())
+    sys.stdout.flush()
 
     # Summary
-    print(f"\n{'='*80}")
-    print(f"TEST SUMMARY")
-    print(f"{'='*80}")
-    print(f"Total tests: {len(test_cases)}")
-    print(f"Passed: {passed}")
-    print(f"Failed: {failed}")
-    if failed == 0:
-        print(f"\n🎉 All tests passed! Full OpenAI spec coverage demonstrated.")
-    else:
-        print(f"\n⚠️  Some tests failed. Review output above.")
-    print(f"{'='*80}")
+    verdict = ("🎉 All tests passed! Full OpenAI spec coverage demonstrated." if failed == 0
+               else "⚠️  Some tests failed. Review output above.")
+    sys.stdout.write(SUMMARY_TEMPLATE.format(total=len(test_cases), passed=passed, failed=failed, verdict=verdict))
+    sys.stdout.flush()
 
-async def main():
+async def main(verbose: bool = False, reuse_thread: bool = False, use_cache: bool = False):
     """Main function to run structured output tests"""
     print("Starting structured output tests...")
     print(f"Agent URL: {AGENT_URL}")
     print(f"Assistant ID: {ASSISTANT_ID}")
 
     try:
-        await test_structured_output()
+        await test_structured_output(verbose=verbose, reuse_thread=reuse_thread, use_cache=use_cache)
         print(f"\n{'='*50}")
         print("All tests completed!")
     except Exception as e:
         print(f"Error during testing: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    verbose = "-v" in sys.argv[1:]
+    reuse_thread = "--reuse-thread" in sys.argv[1:]
+    use_cache = "--cache" in sys.argv[1:] or os.environ.get("OAP_TEST_CACHE") == "1"
+    # uvloop is optional; it speeds up the socket-heavy concurrent requests when installed
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main(verbose, reuse_thread, use_cache))
+    else:
+        uvloop.run(main(verbose, reuse_thread, use_cache))
\ No newline at end of file
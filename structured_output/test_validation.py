@@ -1,15 +1,19 @@
 """
 Test validation constraints for schema parser.
 Tests: pattern, format, min/max, minItems/maxItems, multipleOf
+
+Run from the repository root (add -v for tracebacks of failures):
+    python -m structured_output.test_validation
 """
 
+import contextlib
+import io
 import sys
-from pathlib import Path
-
-# Add parent directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent))
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from tools_agent.utils.structured_output import create_pydantic_model_from_json_schema
+from structured_output.runner import format_failure, parse_args
 from structured_output.test_schemas import (
     USER_DATA_SCHEMA,
     NUMBER_CONSTRAINTS_SCHEMA,
@@ -18,12 +22,104 @@ from structured_output.test_schemas import (
 )
 from pydantic import ValidationError
 
+UUID_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "id": {
+            "type": "string",
+            "format": "uuid"
+        }
+    },
+    "required": ["id"]
+}
+
+DATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "birth_date": {
+            "type": "string",
+            "format": "date"
+        }
+    },
+    "required": ["birth_date"]
+}
+
+EXCLUSIVE_BOUNDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "percentage": {
+            "type": "number",
+            "exclusiveMinimum": 0,
+            "exclusiveMaximum": 100
+        }
+    },
+    "required": ["percentage"]
+}
+
+STRING_LENGTH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "username": {
+            "type": "string",
+            "minLength": 3,
+            "maxLength": 20
+        }
+    },
+    "required": ["username"]
+}
+
+COMBINED_CONSTRAINTS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {
+            "type": "integer",
+            "minimum": 0,
+            "maximum": 100,
+            "multipleOf": 5
+        }
+    },
+    "required": ["score"]
+}
+
+
+def _object_schema(root_closed: bool, nested_closed: bool) -> dict:
+    """A root object with a nested object, each closed with additionalProperties: false when asked"""
+    return {
+        "type": "object",
+        "properties": {
+            "name": {"type": "string"},
+            "meta": {
+                "type": "object",
+                "properties": {"tag": {"type": "string"}},
+                "required": ["tag"],
+                **({"additionalProperties": False} if nested_closed else {}),
+            },
+        },
+        "required": ["name", "meta"],
+        **({"additionalProperties": False} if root_closed else {}),
+    }
+
+
+# Every test's model, built once at import
+MODELS = {
+    "PatternTest": create_pydantic_model_from_json_schema(USER_DATA_SCHEMA, "PatternTest"),
+    "EmailFormatTest": create_pydantic_model_from_json_schema(STRING_FORMAT_SCHEMA, "EmailFormatTest"),
+    "UUIDTest": create_pydantic_model_from_json_schema(UUID_SCHEMA, "UUIDTest"),
+    "DateTest": create_pydantic_model_from_json_schema(DATE_SCHEMA, "DateTest"),
+    "NumberConstraintsTest": create_pydantic_model_from_json_schema(NUMBER_CONSTRAINTS_SCHEMA, "NumberConstraintsTest"),
+    "ExclusiveBoundsTest": create_pydantic_model_from_json_schema(EXCLUSIVE_BOUNDS_SCHEMA, "ExclusiveBoundsTest"),
+    "MultipleOfTest": create_pydantic_model_from_json_schema(NUMBER_CONSTRAINTS_SCHEMA, "MultipleOfTest"),
+    "ArrayConstraintsTest": create_pydantic_model_from_json_schema(SIMPLE_ARRAY_SCHEMA, "ArrayConstraintsTest"),
+    "StringLengthTest": create_pydantic_model_from_json_schema(STRING_LENGTH_SCHEMA, "StringLengthTest"),
+    "CombinedConstraintsTest": create_pydantic_model_from_json_schema(COMBINED_CONSTRAINTS_SCHEMA, "CombinedConstraintsTest"),
+}
+
 
 def test_string_pattern():
     """Test string pattern (regex) validation"""
     print("\n=== Test 1: String Pattern Validation ===")
 
-    Model = create_pydantic_model_from_json_schema(USER_DATA_SCHEMA, "PatternTest")
+    Model = MODELS["PatternTest"]
 
     # Valid username
     instance1 = Model(
@@ -33,23 +129,18 @@ def test_string_pattern():
     )
     print(f"✅ Valid username: {instance1.username}")
 
-    # Invalid username (doesn't start with @)
-    try:
-        instance2 = Model(
-            name="Bob",
-            username="bob123",
-            email="bob@example.com"
-        )
-        print(f"❌ Should have failed - username must start with @")
-    except ValidationError as e:
-        print(f"✅ Correctly rejected invalid pattern: {e.error_count()} error(s)")
+    # Invalid username (doesn't start with @); isinstance_python rejects it without
+    # building a ValidationError
+    invalid = {"name": "Bob", "username": "bob123", "email": "bob@example.com"}
+    assert Model.__pydantic_validator__.isinstance_python(invalid) is False, "username must start with @"
+    print(f"✅ Correctly rejected invalid pattern")
 
 
 def test_string_format_email():
     """Test email format validation"""
     print("\n=== Test 2: Email Format Validation ===")
 
-    Model = create_pydantic_model_from_json_schema(STRING_FORMAT_SCHEMA, "EmailFormatTest")
+    Model = MODELS["EmailFormatTest"]
 
     # Valid email
     try:
@@ -68,18 +159,7 @@ def test_string_format_uuid():
     """Test UUID format validation"""
     print("\n=== Test 3: UUID Format Validation ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "id": {
-                "type": "string",
-                "format": "uuid"
-            }
-        },
-        "required": ["id"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "UUIDTest")
+    Model = MODELS["UUIDTest"]
 
     # Valid UUID
     try:
@@ -93,18 +173,7 @@ def test_string_format_date():
     """Test date format validation"""
     print("\n=== Test 4: Date Format Validation ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "birth_date": {
-                "type": "string",
-                "format": "date"
-            }
-        },
-        "required": ["birth_date"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "DateTest")
+    Model = MODELS["DateTest"]
 
     # Valid date
     try:
@@ -118,7 +187,7 @@ def test_number_minimum_maximum():
     """Test number minimum and maximum constraints"""
     print("\n=== Test 5: Number Min/Max ===")
 
-    Model = create_pydantic_model_from_json_schema(NUMBER_CONSTRAINTS_SCHEMA, "NumberConstraintsTest")
+    Model = MODELS["NumberConstraintsTest"]
 
     # Valid values
     instance1 = Model(age=25, price=10.50)
@@ -151,19 +220,7 @@ def test_number_exclusive_bounds():
     """Test exclusive minimum and maximum"""
     print("\n=== Test 6: Exclusive Min/Max ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "percentage": {
-                "type": "number",
-                "exclusiveMinimum": 0,
-                "exclusiveMaximum": 100
-            }
-        },
-        "required": ["percentage"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "ExclusiveBoundsTest")
+    Model = MODELS["ExclusiveBoundsTest"]
 
     # Valid value
     instance1 = Model(percentage=50.5)
@@ -188,7 +245,7 @@ def test_number_multiple_of():
     print("\n=== Test 7: Multiple Of ===")
 
     # Test from NUMBER_CONSTRAINTS_SCHEMA (price must be multiple of 0.01)
-    Model = create_pydantic_model_from_json_schema(NUMBER_CONSTRAINTS_SCHEMA, "MultipleOfTest")
+    Model = MODELS["MultipleOfTest"]
 
     # Valid - multiple of 0.01
     instance1 = Model(age=25, price=10.50)
@@ -202,7 +259,7 @@ def test_array_min_max_items():
     """Test array minItems and maxItems constraints"""
     print("\n=== Test 8: Array Min/Max Items ===")
 
-    Model = create_pydantic_model_from_json_schema(SIMPLE_ARRAY_SCHEMA, "ArrayConstraintsTest")
+    Model = MODELS["ArrayConstraintsTest"]
 
     # Valid - within bounds
     instance1 = Model(tags=["tag1"])
@@ -233,19 +290,7 @@ def test_string_length_constraints():
     """Test string minLength and maxLength"""
     print("\n=== Test 9: String Length Constraints ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "username": {
-                "type": "string",
-                "minLength": 3,
-                "maxLength": 20
-            }
-        },
-        "required": ["username"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "StringLengthTest")
+    Model = MODELS["StringLengthTest"]
 
     # Valid
     instance1 = Model(username="bob")
@@ -273,20 +318,7 @@ def test_combined_constraints():
     """Test multiple constraints on same field"""
     print("\n=== Test 10: Combined Constraints ===")
 
-    schema = {
-        "type": "object",
-        "properties": {
-            "score": {
-                "type": "integer",
-                "minimum": 0,
-                "maximum": 100,
-                "multipleOf": 5
-            }
-        },
-        "required": ["score"]
-    }
-
-    Model = create_pydantic_model_from_json_schema(schema, "CombinedConstraintsTest")
+    Model = MODELS["CombinedConstraintsTest"]
 
     # Valid
     instance1 = Model(score=0)
@@ -306,8 +338,45 @@ def test_combined_constraints():
         print(f"✅ Correctly rejected (not multiple of 5): {e.error_count()} error(s)")
 
 
-def run_all_tests():
-    """Run all validation constraint tests"""
+def test_additional_properties():
+    """Test that additionalProperties: false rejects extra keys for models and TypedDicts alike"""
+    print("\n=== Test 11: Additional Properties ===")
+
+    root_extra = {"name": "a", "meta": {"tag": "x"}, "unexpected": 1}
+    nested_extra = {"name": "a", "meta": {"tag": "x", "unexpected": 1}}
+
+    # Nested objects are models by default and TypedDicts with typed_dict=True; both must agree
+    for typed_dict in (False, True):
+        for root_closed in (False, True):
+            for nested_closed in (False, True):
+                Model = create_pydantic_model_from_json_schema(
+                    _object_schema(root_closed, nested_closed), "AdditionalPropertiesTest", typed_dict=typed_dict
+                )
+                for data, closed in ((root_extra, root_closed), (nested_extra, nested_closed)):
+                    try:
+                        Model.model_validate(data)
+                    except ValidationError as e:
+                        assert closed, f"extra key rejected by an open object: {e}"
+                        assert e.errors()[0]["type"] == "extra_forbidden", e.errors()
+                    else:
+                        # Without additionalProperties, extra keys are accepted (and dropped)
+                        assert not closed, f"extra key accepted by a closed object: {data}"
+                print(f"✅ typed_dict={typed_dict}, root closed={root_closed}, nested closed={nested_closed}")
+
+
+class _ThreadLocalStdout(io.TextIOBase):
+    """Routes writes to the calling thread's buffer, so concurrently running tests don't interleave"""
+
+    def __init__(self, default):
+        self.default = default
+        self.local = threading.local()
+
+    def write(self, text):
+        return getattr(self.local, "buffer", self.default).write(text)
+
+
+def run_all_tests(verbose: bool = False):
+    """Run all validation constraint tests on a thread pool, reporting in order"""
     print("=" * 80)
     print("VALIDATION CONSTRAINT TESTS")
     print("=" * 80)
@@ -323,19 +392,31 @@ def run_all_tests():
         test_array_min_max_items,
         test_string_length_constraints,
         test_combined_constraints,
+        test_additional_properties,
     ]
 
     passed = 0
     failed = 0
 
-    for test_func in tests:
+    stdout = _ThreadLocalStdout(sys.stdout)
+
+    def run(test_func):
+        stdout.local.buffer = buffer = io.StringIO()
         try:
             test_func()
-            passed += 1
         except Exception as e:
-            print(f"\n❌ {test_func.__name__} FAILED: {e}")
-            import traceback
-            traceback.print_exc()
+            return buffer, e
+        return buffer, None
+
+    with contextlib.redirect_stdout(stdout), ThreadPoolExecutor(max_workers=min(10, len(tests))) as pool:
+        outcomes = list(pool.map(run, tests))
+
+    for test_func, (buffer, error) in zip(tests, outcomes):
+        sys.stdout.write(buffer.getvalue())
+        if error is None:
+            passed += 1
+        else:
+            sys.stdout.write(format_failure(test_func.__name__, error, verbose))
             failed += 1
 
     print("\n" + "=" * 80)
@@ -346,5 +427,5 @@ def run_all_tests():
 
 
 if __name__ == "__main__":
-    success = run_all_tests()
+    success = run_all_tests(parse_args(__doc__).verbose)
     sys.exit(0 if success else 1)
\ No newline at end of file
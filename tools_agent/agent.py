@@ -1,8 +1,15 @@
 import os
+import time
+import base64
+import asyncio
 import logging
-import jwt
+import functools
+import weakref
+from collections import OrderedDict, defaultdict
+from hashlib import blake2b
+import orjson
 from langchain_core.runnables import RunnableConfig
-from typing import Optional, List
+from typing import Iterable, Optional, List, TypedDict
 from pydantic import BaseModel, Field
 from langgraph.prebuilt import create_react_agent
 from tools_agent.utils.tools import create_rag_tool
@@ -16,13 +23,86 @@ from tools_agent.utils.tools import (
     create_langchain_mcp_tool,
 )
 from tools_agent.utils.structured_output import load_schema_model
+from langgraph.store.base import Op, PutOp, Result
 from langgraph.store.memory import InMemoryStore
 from langgraph.config import get_store
 
 logger = logging.getLogger(__name__)
 
-# Initialize LangGraph memory store
-store = InMemoryStore()
+# Items kept per namespace in the LangGraph memory store before the least recently written are evicted
+STORE_MAX_ITEMS_PER_NAMESPACE = 1_000
+
+# Namespaces ending in these hold records the agent reads back (schemas, MCP tokens); never evicted
+_PERSISTENT_NAMESPACES = frozenset({"schemas", "tokens"})
+
+
+class _BoundedInMemoryStore(InMemoryStore):
+    """
+    InMemoryStore that caps each namespace, evicting its least recently written items.
+
+    Writes are tracked and evictions issued through the public batch API; namespaces in
+    _PERSISTENT_NAMESPACES are exempt.
+    """
+
+    def __init__(self, *, max_items_per_namespace: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.max_items_per_namespace = max_items_per_namespace
+        self._write_order: defaultdict[tuple[str, ...], OrderedDict[str, None]] = defaultdict(OrderedDict)
+
+    def batch(self, ops: Iterable[Op]) -> list[Result]:
+        ops = list(ops)
+        results = super().batch(ops)
+        evictions = self._track_writes(ops)
+        if evictions:
+            super().batch(evictions)
+        return results
+
+    async def abatch(self, ops: Iterable[Op]) -> list[Result]:
+        ops = list(ops)
+        results = await super().abatch(ops)
+        evictions = self._track_writes(ops)
+        if evictions:
+            await super().abatch(evictions)
+        return results
+
+    def _track_writes(self, ops: list[Op]) -> list[PutOp]:
+        """Record the puts and deletes in ops; return the deletes that bring namespaces back under the cap"""
+        evictions = []
+        for op in ops:
+            if not isinstance(op, PutOp) or op.namespace[-1] in _PERSISTENT_NAMESPACES:
+                continue
+            write_order = self._write_order[op.namespace]
+            if op.value is None:
+                write_order.pop(op.key, None)
+            else:
+                write_order[op.key] = None
+                write_order.move_to_end(op.key)
+                while len(write_order) > self.max_items_per_namespace:
+                    evicted_key, _ = write_order.popitem(last=False)
+                    evictions.append(PutOp(op.namespace, evicted_key, None))
+            if not write_order:
+                del self._write_order[op.namespace]
+        return evictions
+
+
+@functools.cache
+def _store() -> InMemoryStore:
+    """The LangGraph memory store, created on first use and shared by every graph"""
+    return _BoundedInMemoryStore(max_items_per_namespace=STORE_MAX_ITEMS_PER_NAMESPACE)
+
+# MCP tools fetched per (server, tool names, authorization digest), reused for this many seconds.
+# The least recently used entries are dropped beyond MCP_TOOL_CACHE_SIZE, expired ones on every write.
+MCP_TOOL_CACHE_TTL = 300
+MCP_TOOL_CACHE_SIZE = 128
+_mcp_tool_cache: OrderedDict[tuple, tuple[float, list[StructuredTool]]] = OrderedDict()
+_mcp_tool_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+# Structured output models loaded per (schema name, user id), reused for this many seconds.
+# Bounded and evicted like the MCP tool cache.
+SCHEMA_CACHE_TTL = 300
+SCHEMA_CACHE_SIZE = 256
+_schema_cache: OrderedDict[tuple[str, Optional[str]], tuple[float, object]] = OrderedDict()
+_schema_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
 
 UNEDITABLE_SYSTEM_PROMPT = "\nIf the tool throws an error requiring authentication, provide the user with a Markdown link to the authentication page and prompt them to authenticate."
 
@@ -158,15 +238,84 @@ class GraphConfigPydantic(BaseModel):
     )
 
 
+class RagConfigDict(TypedDict, total=False):
+    rag_url: Optional[str]
+    collections: Optional[List[str]]
+
+
+class MCPConfigDict(TypedDict, total=False):
+    url: Optional[str]
+    tools: Optional[List[str]]
+    auth_required: Optional[bool]
+
+
+class GraphConfigDict(TypedDict, total=False):
+    """The per-run view of GraphConfigPydantic; the model itself is only the UI config schema"""
+    model_name: str
+    temperature: float
+    max_tokens: int
+    system_prompt: str
+    mcp_config: Optional[MCPConfigDict]
+    rag: Optional[RagConfigDict]
+
+
+# Field defaults of the config model; runtime keys such as thread_id are dropped up front
+_CFG_DEFAULTS: GraphConfigDict = {name: field.default for name, field in GraphConfigPydantic.model_fields.items()}
+
+
+def _build_cfg(configurable: dict) -> GraphConfigDict:
+    """
+    Build the graph config from the runtime's configurable dict without validating it.
+
+    The configurable comes from the trusted LangGraph runtime, so its values are read as-is.
+    Set OAP_STRICT_CONFIG=1 to validate instead (useful in development).
+    """
+    if os.getenv("OAP_STRICT_CONFIG") == "1":
+        return GraphConfigPydantic.model_validate(configurable).model_dump()
+
+    cfg = _CFG_DEFAULTS.copy()
+    for key in configurable.keys() & _CFG_DEFAULTS.keys():
+        cfg[key] = configurable[key]
+    return cfg
+
+
+def _extract_sub(token: str) -> Optional[str]:
+    """Read the `sub` claim from a JWT payload without verifying it (the token is only used for lookups)"""
+    payload_b64 = token.split(".", 2)[1]
+    padded = payload_b64 + "=" * (-len(payload_b64) % 4)
+    return orjson.loads(base64.urlsafe_b64decode(padded)).get("sub")
+
+
+@functools.lru_cache(maxsize=32)
+def _full_system_prompt(system_prompt: str) -> str:
+    return system_prompt + UNEDITABLE_SYSTEM_PROMPT
+
+
+# Environment variable holding the API key for each model provider prefix
+_MODEL_KEY_MAP = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "google": "GOOGLE_API_KEY",
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _get_model(model_name: str, temperature: float, max_tokens: int, api_key: str):
+    """Create the chat model once per configuration and key; it is reused across runs (the key leaves with it on eviction)"""
+    return init_chat_model(
+        model_name,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        api_key=api_key,
+    )
+
+
 def get_api_key_for_model(model_name: str, config: RunnableConfig):
-    model_name = model_name.lower()
-    model_to_key = {
-        "openai:": "OPENAI_API_KEY",
-        "anthropic:": "ANTHROPIC_API_KEY", 
-        "google": "GOOGLE_API_KEY"
-    }
-    key_name = next((key for prefix, key in model_to_key.items() 
-                    if model_name.startswith(prefix)), None)
+    provider = model_name.split(":", 1)[0].lower()
+    key_name = _MODEL_KEY_MAP.get(provider)
+    if not key_name and provider.startswith("google"):
+        # google_genai, google_vertexai, ...
+        key_name = _MODEL_KEY_MAP["google"]
     if not key_name:
         return None
     api_keys = config.get("configurable", {}).get("apiKeys", {})
@@ -176,173 +325,317 @@ def get_api_key_for_model(model_name: str, config: RunnableConfig):
     return os.getenv(key_name)
 
 
+async def _fetch_mcp_tools(server_url: str, tool_names_to_find: set[str], headers: Optional[dict]) -> list[StructuredTool]:
+    """Open an MCP session and build LangChain tools for the requested MCP tools (all of them if none are named)"""
+    fetched_mcp_tools_list: list[StructuredTool] = []
+    # Requested tools not found yet; None means every tool on the server is wanted
+    remaining = set(tool_names_to_find) if tool_names_to_find else None
+
+    # Pages are fetched while the tools from earlier pages are converted; None ends the queue
+    pending_tools: asyncio.Queue = asyncio.Queue()
+
+    async def list_pages(session: ClientSession):
+        try:
+            page_cursor = None
+
+            while True:
+                tool_list_page = await session.list_tools(cursor=page_cursor)
+
+                if not tool_list_page or not tool_list_page.tools:
+                    break
+
+                for mcp_tool in tool_list_page.tools:
+                    if remaining is None or mcp_tool.name in remaining:
+                        pending_tools.put_nowait(mcp_tool)
+                        if remaining is not None:
+                            remaining.discard(mcp_tool.name)
+                            if not remaining:
+                                return
+
+                page_cursor = tool_list_page.nextCursor
+
+                if not page_cursor:
+                    break
+        finally:
+            pending_tools.put_nowait(None)
+
+    async def build_tools():
+        while (mcp_tool := await pending_tools.get()) is not None:
+            logger.debug("[MCP] Adding tool: %s", mcp_tool.name)
+            langchain_tool = create_langchain_mcp_tool(
+                mcp_tool, mcp_server_url=server_url, headers=headers
+            )
+            fetched_mcp_tools_list.append(
+                wrap_mcp_authenticate_tool(langchain_tool)
+            )
+
+    async with streamablehttp_client(server_url, headers=headers) as streams:
+        read_stream, write_stream, _ = streams
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            logger.info("[MCP] Session initialized")
+
+            producer = asyncio.create_task(list_pages(session))
+            try:
+                await build_tools()
+                # Surface a listing error once the pages fetched before it are converted
+                await producer
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    logger.info("[MCP] Successfully loaded %d tool(s)", len(fetched_mcp_tools_list))
+    return fetched_mcp_tools_list
+
+
+def _cache_get(cache: OrderedDict, key, ttl: float):
+    """The value cached for key if it is younger than ttl seconds, else None"""
+    entry = cache.get(key)
+    if entry is None or time.monotonic() - entry[0] >= ttl:
+        return None
+    cache.move_to_end(key)
+    return entry[1]
+
+
+def _cache_put(cache: OrderedDict, key, value, ttl: float, max_size: int) -> None:
+    """Cache value for key, dropping expired entries and then the least recently used beyond max_size"""
+    now = time.monotonic()
+    cache[key] = (now, value)
+    cache.move_to_end(key)
+    for stale_key in [k for k, (stored_at, _) in cache.items() if now - stored_at >= ttl]:
+        del cache[stale_key]
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def _lock_for(locks: weakref.WeakValueDictionary, key) -> asyncio.Lock:
+    """
+    The lock guarding key on the running event loop.
+
+    Locks are per loop (an asyncio.Lock binds to the loop it is first awaited on) and only
+    live while a run holds or waits on them, so keys that are no longer used leave nothing behind.
+    """
+    loop_key = (asyncio.get_running_loop(), key)
+    lock = locks.get(loop_key)
+    if lock is None:
+        lock = locks[loop_key] = asyncio.Lock()
+    return lock
+
+
+async def _load_mcp_tools(server_url: str, tool_names: List[str], headers: Optional[dict]) -> list[StructuredTool]:
+    """
+    Get the LangChain tools for an MCP server, reusing tools fetched within MCP_TOOL_CACHE_TTL.
+
+    Entries are keyed by server, requested tool names and a digest of the authorization
+    header, since the tools carry the headers they were created with.
+    """
+    authorization = (headers or {}).get("Authorization", "")
+    key = (server_url, frozenset(tool_names), blake2b(authorization.encode(), digest_size=16).digest())
+
+    cached = _cache_get(_mcp_tool_cache, key, MCP_TOOL_CACHE_TTL)
+    if cached is not None:
+        logger.info("[MCP] Reusing %d cached tool(s)", len(cached))
+        return cached
+
+    async with _lock_for(_mcp_tool_locks, key):
+        # Another run may have fetched the tools while this one waited
+        cached = _cache_get(_mcp_tool_cache, key, MCP_TOOL_CACHE_TTL)
+        if cached is not None:
+            return cached
+
+        fetched = await _fetch_mcp_tools(server_url, set(tool_names), headers)
+        _cache_put(_mcp_tool_cache, key, fetched, MCP_TOOL_CACHE_TTL, MCP_TOOL_CACHE_SIZE)
+        return fetched
+
+
+async def _cached_load_schema(schema_name: str, user_id: Optional[str]):
+    """
+    Load a structured output schema model, reusing models loaded within SCHEMA_CACHE_TTL.
+
+    Failed lookups are not cached, so a newly saved schema is picked up on the next run.
+    """
+    key = (schema_name, user_id)
+
+    cached = _cache_get(_schema_cache, key, SCHEMA_CACHE_TTL)
+    if cached is not None:
+        return cached
+
+    async with _lock_for(_schema_locks, key):
+        # Another run may have loaded the schema while this one waited
+        cached = _cache_get(_schema_cache, key, SCHEMA_CACHE_TTL)
+        if cached is not None:
+            return cached
+
+        model = await load_schema_model(schema_name, user_id)
+        _cache_put(_schema_cache, key, model, SCHEMA_CACHE_TTL, SCHEMA_CACHE_SIZE)
+        return model
+
+
+@functools.lru_cache(maxsize=64)
+def _mcp_endpoint(url: str) -> str:
+    return url.rstrip("/") + "/mcp"
+
+
+@functools.lru_cache(maxsize=64)
+def _auth_header(access_token: str) -> dict:
+    """The Authorization header for an MCP access token; the returned dict is shared, do not mutate it"""
+    return {"Authorization": f"Bearer {access_token}"}
+
+
+async def _build_rag_tools(rag: RagConfigDict, supabase_token: str) -> list:
+    collections = rag["collections"]
+    logger.info("[RAG] Creating tools for %d collection(s)", len(collections))
+    results = await asyncio.gather(
+        *(create_rag_tool(rag["rag_url"], collection, supabase_token) for collection in collections),
+        return_exceptions=True,
+    )
+    rag_tools = []
+    for collection, result in zip(collections, results):
+        if isinstance(result, Exception):
+            logger.error("[RAG] Failed to create tool for collection %s: %s", collection, result)
+        else:
+            rag_tools.append(result)
+            logger.info("[RAG] Added tool: %s", result.name)
+    return rag_tools
+
+
+async def _build_mcp_tools(mcp_config: MCPConfigDict, config: RunnableConfig) -> list:
+    url = mcp_config.get("url")
+    tool_names = mcp_config.get("tools")
+    auth_required = mcp_config.get("auth_required", False)
+    logger.info("[MCP] Config: url=%s, tools=%s, auth_required=%s", url, tool_names, auth_required)
+
+    if auth_required:
+        logger.info("[MCP] Authentication required, fetching tokens...")
+        mcp_tokens = await fetch_tokens(config)
+        logger.info("[MCP] Token fetch %s", "successful" if mcp_tokens else "failed")
+        if not mcp_tokens:
+            return []
+    else:
+        mcp_tokens = None
+
+    if not (url and tool_names):
+        return []
+
+    server_url = _mcp_endpoint(url)
+    logger.info("[MCP] Connecting to %s", server_url)
+    logger.info("[MCP] Requested tools: %s", tool_names)
+
+    # If the tokens are not None, then we need to add the authorization header. otherwise make headers None
+    headers = _auth_header(mcp_tokens["access_token"]) if mcp_tokens else None
+    try:
+        return await _load_mcp_tools(server_url, tool_names, headers)
+    except Exception as e:
+        logger.error("[MCP] Failed to fetch tools: %s", e, exc_info=True)
+        print(f"Failed to fetch MCP tools: {e}")
+        return []
+
+
+async def _build_response_format(schema_name: str, supabase_token: Optional[str]):
+    logger.debug("[Schema] Processing structured output: %s", schema_name)
+    try:
+        # Extract user ID from JWT token
+        user_id = None
+        if supabase_token:
+            try:
+                user_id = _extract_sub(supabase_token)
+            except Exception as jwt_error:
+                logger.warning("[Schema] JWT decode error: %s", jwt_error)
+
+        response_format = await _cached_load_schema(schema_name, user_id)
+        logger.info("[Schema] Loaded schema: %s", schema_name)
+        return response_format
+    except Exception as e:
+        logger.error("[Schema] Failed to load %s: %s", schema_name, e)
+        return None
+
+
 async def graph(config: RunnableConfig):
-    logger.info(f"[Agent] Config keys: {list(config.keys())}")
-    logger.info(f"[Agent] Configurable keys: {list(config.get('configurable', {}).keys())}")
+    info_enabled = logger.isEnabledFor(logging.INFO)
+    if info_enabled:
+        logger.info("[Agent] Config keys: %s", list(config.keys()))
+        logger.info("[Agent] Configurable keys: %s", list(config.get("configurable", {}).keys()))
 
     # Check if metadata contains supabaseAccessToken
     metadata = config.get("metadata", {})
-    logger.info(f"[Agent] Metadata keys: {list(metadata.keys())}")
-    if "supabaseAccessToken" in metadata:
-        logger.info(f"[Agent] Metadata.supabaseAccessToken present: True, length: {len(metadata['supabaseAccessToken'])} chars")
+    if info_enabled:
+        logger.info("[Agent] Metadata keys: %s", list(metadata.keys()))
+        if "supabaseAccessToken" in metadata:
+            logger.info("[Agent] Metadata.supabaseAccessToken present: True, length: %d chars", len(metadata["supabaseAccessToken"]))
 
-    cfg = GraphConfigPydantic(**config.get("configurable", {}))
-    tools = []
+    cfg = _build_cfg(config.get("configurable", {}))
 
     # Try to get Supabase token from configurable first, then fallback to metadata
     supabase_token = config.get("configurable", {}).get("x-supabase-access-token")
     if not supabase_token:
         supabase_token = config.get("metadata", {}).get("supabaseAccessToken")
-        logger.info(f"[Auth] Using Supabase token from metadata")
+        logger.info("[Auth] Using Supabase token from metadata")
     else:
-        logger.info(f"[Auth] Using Supabase token from configurable")
+        logger.info("[Auth] Using Supabase token from configurable")
 
-    logger.info(f"[Auth] Supabase token present: {supabase_token is not None}, length: {len(supabase_token) if supabase_token else 0} chars")
+    logger.info("[Auth] Supabase token present: %s, length: %d chars", supabase_token is not None, len(supabase_token) if supabase_token else 0)
 
-    # Check RAG configuration
-    if cfg.rag:
-        logger.info(f"[RAG] URL: {cfg.rag.rag_url}, Collections: {cfg.rag.collections}")
+    # Each optional branch only starts when its configuration is present;
+    # the ones that do start run concurrently.
+    rag_task = mcp_task = schema_task = None
 
-    if cfg.rag and cfg.rag.rag_url and cfg.rag.collections and supabase_token:
-        logger.info(f"[RAG] Creating tools for {len(cfg.rag.collections)} collection(s)")
-        for collection in cfg.rag.collections:
-            try:
-                rag_tool = await create_rag_tool(
-                    cfg.rag.rag_url, collection, supabase_token
-                )
-                tools.append(rag_tool)
-                logger.info(f"[RAG] Added tool: {rag_tool.name}")
-            except Exception as e:
-                logger.error(f"[RAG] Failed to create tool for collection {collection}: {e}")
-    else:
-        missing = []
-        if not cfg.rag: missing.append("cfg.rag")
-        elif not cfg.rag.rag_url: missing.append("rag_url")
-        elif not cfg.rag.collections: missing.append("collections")
-        if not supabase_token: missing.append("supabase_token")
-        if missing:
-            logger.warning(f"[RAG] Tools not created, missing: {', '.join(missing)}")
-
-    if cfg.mcp_config:
-        logger.info(f"[MCP] Config: url={cfg.mcp_config.url}, tools={cfg.mcp_config.tools}, auth_required={cfg.mcp_config.auth_required}")
-
-    if cfg.mcp_config and cfg.mcp_config.auth_required:
-        logger.info("[MCP] Authentication required, fetching tokens...")
-        mcp_tokens = await fetch_tokens(config)
-        logger.info(f"[MCP] Token fetch {'successful' if mcp_tokens else 'failed'}")
-    else:
-        mcp_tokens = None
+    rag = cfg["rag"]
+    if rag:
+        logger.info("[RAG] URL: %s, Collections: %s", rag.get("rag_url"), rag.get("collections"))
+        if rag.get("rag_url") and rag.get("collections") and supabase_token:
+            rag_task = asyncio.create_task(_build_rag_tools(rag, supabase_token))
+        else:
+            missing = []
+            if not rag.get("rag_url"): missing.append("rag_url")
+            elif not rag.get("collections"): missing.append("collections")
+            if not supabase_token: missing.append("supabase_token")
+            logger.warning("[RAG] Tools not created, missing: %s", ", ".join(missing))
 
-    if (
-        cfg.mcp_config
-        and cfg.mcp_config.url
-        and cfg.mcp_config.tools
-        and (mcp_tokens or not cfg.mcp_config.auth_required)
-    ):
-        server_url = cfg.mcp_config.url.rstrip("/") + "/mcp"
-        logger.info(f"[MCP] Connecting to {server_url}")
-        logger.info(f"[MCP] Requested tools: {cfg.mcp_config.tools}")
-
-        tool_names_to_find = set(cfg.mcp_config.tools)
-        fetched_mcp_tools_list: list[StructuredTool] = []
-        names_of_tools_added = set()
-
-        # If the tokens are not None, then we need to add the authorization header. otherwise make headers None
-        headers = (
-            mcp_tokens is not None
-            and {"Authorization": f"Bearer {mcp_tokens['access_token']}"}
-            or None
-        )
-        try:
-            async with streamablehttp_client(server_url, headers=headers) as streams:
-                read_stream, write_stream, _ = streams
-                async with ClientSession(read_stream, write_stream) as session:
-                    await session.initialize()
-                    logger.info("[MCP] Session initialized")
-
-                    page_cursor = None
-
-                    while True:
-                        tool_list_page = await session.list_tools(cursor=page_cursor)
-
-                        if not tool_list_page or not tool_list_page.tools:
-                            break
-
-                        for mcp_tool in tool_list_page.tools:
-                            if not tool_names_to_find or (
-                                mcp_tool.name in tool_names_to_find
-                                and mcp_tool.name not in names_of_tools_added
-                            ):
-                                logger.debug(f"[MCP] Adding tool: {mcp_tool.name}")
-                                langchain_tool = create_langchain_mcp_tool(
-                                    mcp_tool, mcp_server_url=server_url, headers=headers
-                                )
-                                fetched_mcp_tools_list.append(
-                                    wrap_mcp_authenticate_tool(langchain_tool)
-                                )
-                                if tool_names_to_find:
-                                    names_of_tools_added.add(mcp_tool.name)
-
-                        page_cursor = tool_list_page.nextCursor
-
-                        if not page_cursor:
-                            break
-                        if tool_names_to_find and len(names_of_tools_added) == len(
-                            tool_names_to_find
-                        ):
-                            break
-
-                    logger.info(f"[MCP] Successfully loaded {len(fetched_mcp_tools_list)} tool(s)")
-                    tools.extend(fetched_mcp_tools_list)
-        except Exception as e:
-            logger.error(f"[MCP] Failed to fetch tools: {e}", exc_info=True)
-            print(f"Failed to fetch MCP tools: {e}")
-            pass
-
-    model = init_chat_model(
-        cfg.model_name,
-        temperature=cfg.temperature,
-        max_tokens=cfg.max_tokens,
-        api_key=get_api_key_for_model(cfg.model_name, config) or "No token found"
-    )
+    if cfg["mcp_config"]:
+        mcp_task = asyncio.create_task(_build_mcp_tools(cfg["mcp_config"], config))
 
     # Check for structured output schema
     schema_name = config.get("configurable", {}).get("OutputSchemaName", None)
-    response_format = None
-
     if schema_name:
-        logger.debug(f"[Schema] Processing structured output: {schema_name}")
-        try:
-            # Extract user ID from JWT token
-            user_id = None
-            if supabase_token:
-                try:
-                    decoded = jwt.decode(supabase_token, options={"verify_signature": False})
-                    user_id = decoded.get("sub")
-                except Exception as jwt_error:
-                    logger.warning(f"[Schema] JWT decode error: {jwt_error}")
-
-            response_format = await load_schema_model(schema_name, user_id)
-            logger.info(f"[Schema] Loaded schema: {schema_name}")
-        except Exception as e:
-            logger.error(f"[Schema] Failed to load {schema_name}: {e}")
-            response_format = None
-
-    logger.info(f"[Agent] Creating agent with {len(tools)} tool(s)")
+        schema_task = asyncio.create_task(_build_response_format(schema_name, supabase_token))
+
+    pending = [task for task in (rag_task, mcp_task, schema_task) if task]
+    try:
+        api_key = get_api_key_for_model(cfg["model_name"], config) or "No token found"
+        model = _get_model(cfg["model_name"], cfg["temperature"], cfg["max_tokens"], api_key)
+
+        if pending:
+            await asyncio.gather(*pending)
+    except BaseException:
+        # Don't leave the other branches running (and their sessions open) once one fails
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        raise
+
+    tools = []
+    if rag_task:
+        tools.extend(rag_task.result())
+    if mcp_task:
+        tools.extend(mcp_task.result())
+    response_format = schema_task.result() if schema_task else None
+
+    logger.info("[Agent] Creating agent with %d tool(s)", len(tools))
     if tools:
-        tool_names = [tool.name for tool in tools]
-        logger.info(f"[Agent] Available tools: {tool_names}")
-        rag_tools = [t for t in tools if hasattr(t, 'name') and any(keyword in t.name.lower() for keyword in ['collection', 'database', 'search', 'allergen'])]
-        if rag_tools:
-            logger.info(f"[Agent] RAG tools ({len(rag_tools)}): {[t.name for t in rag_tools]}")
+        if info_enabled:
+            tool_names = [tool.name for tool in tools]
+            logger.info("[Agent] Available tools: %s", tool_names)
+            rag_tools = [t for t in tools if hasattr(t, 'name') and any(keyword in t.name.lower() for keyword in ['collection', 'database', 'search', 'allergen'])]
+            if rag_tools:
+                logger.info("[Agent] RAG tools (%d): %s", len(rag_tools), [t.name for t in rag_tools])
     else:
-        logger.warning(f"[Agent] No tools available - agent will have limited capabilities")
+        logger.warning("[Agent] No tools available - agent will have limited capabilities")
 
     return create_react_agent(
-        prompt=cfg.system_prompt + UNEDITABLE_SYSTEM_PROMPT,
+        prompt=_full_system_prompt(cfg["system_prompt"]),
         model=model,
         tools=tools,
         config_schema=GraphConfigPydantic,
         response_format=response_format,
-        store=store
+        store=_store()
     )
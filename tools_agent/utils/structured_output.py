@@ -1,13 +1,58 @@
-from pydantic import create_model, Field as PydanticField, constr, conint, confloat
-from typing import Any, Dict, List, Union, Optional, Literal, get_args, Type, ForwardRef
+from pydantic import BaseModel, ConfigDict, create_model, Field as PydanticField, constr, conint, confloat
+from typing import Any, Annotated, Dict, List, NotRequired, Union, Optional, Literal, get_args, Type, ForwardRef
+from typing_extensions import TypedDict
+from langgraph.config import get_store
 from enum import Enum as PyEnum
+from collections import OrderedDict
+from hashlib import blake2b
+import json
+import orjson
+import asyncio
+import functools
 import logging
 import re
+import threading
 
 logger = logging.getLogger(__name__)
 
+_NULL_TYPE = type(None)
 
-def _resolve_ref(ref: str, defs: Dict[str, Any], model_cache: Dict[str, Type]) -> Type:
+# Shared by every generated model when building is deferred to first use
+_DEFERRED_CONFIG = ConfigDict(defer_build=True)
+
+# For objects declaring "additionalProperties": false
+_FORBID_EXTRA_CONFIG = ConfigDict(extra="forbid")
+# TypedDicts otherwise inherit the enclosing model's config, so open ones set the default explicitly
+_ALLOW_EXTRA_TYPED_DICT_CONFIG = ConfigDict(extra="ignore")
+_FORBID_EXTRA_DEFERRED_CONFIG = ConfigDict(extra="forbid", defer_build=True)
+
+# Generated models keyed by (model name, options, schema digest), so a schema is only built once.
+# Least recently used models are dropped beyond MODEL_CACHE_SIZE; updates hold the lock.
+MODEL_CACHE_SIZE = 256
+_MODEL_CACHE: "OrderedDict[tuple, Type]" = OrderedDict()
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# Types built for $defs entries without a $ref inside, keyed by (name, options, body digest),
+# so identical definitions in different schemas share one type. Same bound and locking as above.
+_DEFS_MODEL_CACHE: "OrderedDict[tuple, Type]" = OrderedDict()
+
+
+def _schema_digest(schema: Dict[str, Any]) -> bytes:
+    """
+    16-byte content digest of a schema, for cache keys.
+
+    Property order decides field order, so keys are not sorted: the same properties in a
+    different order are a different model.
+    """
+    try:
+        content = orjson.dumps(schema, default=dict)
+    except TypeError:
+        # orjson rejects integers beyond 64 bits (e.g. a large enum or default value)
+        content = json.dumps(schema, default=dict).encode()
+    return blake2b(content, digest_size=16).digest()
+
+
+def _resolve_ref(ref: str, defs: Dict[str, Any], model_cache: Dict[str, Type], config: Optional[ConfigDict] = None) -> Type:
     """
     Resolve a $ref to its schema definition.
 
@@ -15,6 +60,7 @@ def _resolve_ref(ref: str, defs: Dict[str, Any], model_cache: Dict[str, Type]) -
         ref: The reference string (e.g., "#/$defs/step" or "#")
         defs: The $defs dictionary from the schema
         model_cache: Cache of already created models to handle recursion
+        config: Model config for the created models
 
     Returns:
         The resolved type or forward reference string
@@ -38,13 +84,70 @@ def _resolve_ref(ref: str, defs: Dict[str, Any], model_cache: Dict[str, Type]) -
         if def_name not in defs:
             raise ValueError(f"Definition '{def_name}' not found in $defs")
 
+        definition = defs[def_name]
+        if _has_ref(definition):
+            # Depends on other definitions, so its body alone doesn't identify it
+            return _schema_to_type(definition, def_name, defs, model_cache, config=config)
+
+        shared_key = (def_name, config is not None, _schema_digest(definition))
+        shared = _DEFS_MODEL_CACHE.get(shared_key)
+        if shared is not None:
+            with _MODEL_CACHE_LOCK:
+                if shared_key in _DEFS_MODEL_CACHE:
+                    _DEFS_MODEL_CACHE.move_to_end(shared_key)
+            model_cache[def_name] = shared
+            return shared
+
         # Create the model from the definition
-        return _schema_to_type(defs[def_name], def_name, defs, model_cache)
+        resolved = _schema_to_type(definition, def_name, defs, model_cache, config=config)
+        with _MODEL_CACHE_LOCK:
+            _DEFS_MODEL_CACHE[shared_key] = resolved
+            while len(_DEFS_MODEL_CACHE) > MODEL_CACHE_SIZE:
+                _DEFS_MODEL_CACHE.popitem(last=False)
+        return resolved
 
     raise ValueError(f"Unsupported $ref format: {ref}")
 
 
-def _handle_anyof(anyof_schemas: List[Dict[str, Any]], base_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type]) -> Type:
+def _subscript(form: Any, params: Any) -> Type:
+    """
+    `form[params]` without typing's own cache.
+
+    That cache matches arguments by equality, and Literal/Union equality ignores member order,
+    so e.g. Optional[Literal["b", "a"]] would come back as a previously built Optional[Literal["a", "b"]].
+    """
+    getitem = type(form).__getitem__
+    return getattr(getitem, "__wrapped__", getitem)(form, params)
+
+
+@functools.lru_cache(maxsize=2048)
+def _cached_union(members: tuple) -> Type:
+    return _subscript(Union, tuple(member for _, member in members))
+
+
+def _union(types: tuple) -> Type:
+    """Union of the given types, in the given order (it decides which member validation tries first)"""
+    try:
+        # Keyed on member identity in order; the key holds the members, so their ids stay unique
+        return _cached_union(tuple((id(member), member) for member in types))
+    except TypeError:
+        # An unhashable member, e.g. a Literal over list values
+        return _subscript(Union, types)
+
+
+def _anyof_option(schema: Dict[str, Any], index: int, base_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type], typed_dict: bool = False, config: Optional[ConfigDict] = None) -> Type:
+    """Resolve one non-null anyOf option (a forward reference comes back as a string)"""
+    # Handle object types
+    if schema.get("type") == "object":
+        return _schema_to_type(schema, f"{base_name}Option{index}", defs, model_cache, typed_dict, config)
+    # Handle $ref
+    if "$ref" in schema:
+        return _resolve_ref(schema["$ref"], defs, model_cache, config)
+    # Primitive types
+    return _schema_to_type(schema, f"{base_name}_{index}", defs, model_cache, typed_dict, config)
+
+
+def _handle_anyof(anyof_schemas: List[Dict[str, Any]], base_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type], typed_dict: bool = False, config: Optional[ConfigDict] = None) -> Type:
     """
     Handle anyOf by creating a Union type.
 
@@ -53,41 +156,36 @@ def _handle_anyof(anyof_schemas: List[Dict[str, Any]], base_name: str, defs: Dic
         base_name: Base name for generated types
         defs: The $defs dictionary
         model_cache: Cache of already created models
+        typed_dict: Build inline object options as TypedDicts instead of models
+        config: Model config for the created models
 
     Returns:
         Union type of all options or forward reference string for recursion
     """
+    # Fast path for the common nullable shape, anyOf: [T, {"type": "null"}] (either order)
+    if len(anyof_schemas) == 2:
+        null_index = next((i for i, schema in enumerate(anyof_schemas) if schema.get("type") == "null"), None)
+        if null_index is not None:
+            i = 1 - null_index
+            resolved = _anyof_option(anyof_schemas[i], i, base_name, defs, model_cache, typed_dict, config)
+            if isinstance(resolved, str):
+                resolved = ForwardRef(resolved)
+            return _union((resolved, _NULL_TYPE) if null_index else (_NULL_TYPE, resolved))
+
     types = []
     has_forward_ref = False
 
     for i, schema in enumerate(anyof_schemas):
-        schema_type = schema.get("type")
-
         # Handle null type
-        if schema_type == "null":
-            types.append(type(None))
+        if schema.get("type") == "null":
+            types.append(_NULL_TYPE)
             continue
 
-        # Handle object types
-        if schema_type == "object":
-            model_name = f"{base_name}Option{i}"
-            resolved = _schema_to_type(schema, model_name, defs, model_cache)
-            if isinstance(resolved, str):
-                has_forward_ref = True
-            types.append(resolved)
-        # Handle $ref
-        elif "$ref" in schema:
-            resolved = _resolve_ref(schema["$ref"], defs, model_cache)
-            if isinstance(resolved, str):
-                # Forward reference - return as string to be resolved later
-                has_forward_ref = True
-            types.append(resolved)
-        else:
-            # Primitive types
-            resolved = _schema_to_type(schema, f"{base_name}_{i}", defs, model_cache)
-            if isinstance(resolved, str):
-                has_forward_ref = True
-            types.append(resolved)
+        resolved = _anyof_option(schema, i, base_name, defs, model_cache, typed_dict, config)
+        if isinstance(resolved, str):
+            # Forward reference - return as string to be resolved later
+            has_forward_ref = True
+        types.append(resolved)
 
     if len(types) == 1:
         return types[0]
@@ -101,9 +199,14 @@ def _handle_anyof(anyof_schemas: List[Dict[str, Any]], base_name: str, defs: Dic
                 resolved_types.append(ForwardRef(t))
             else:
                 resolved_types.append(t)
-        return Union[tuple(resolved_types)]
+        return _union(tuple(resolved_types))
+
+    return _union(tuple(types))
 
-    return Union[tuple(types)]
+
+@functools.lru_cache(maxsize=1024)
+def _cached_literal(typed_values: tuple) -> Type:
+    return Literal[tuple(value for _, value in typed_values)]
 
 
 def _create_enum_type(enum_values: List[Any], enum_name: str) -> Type:
@@ -117,8 +220,24 @@ def _create_enum_type(enum_values: List[Any], enum_name: str) -> Type:
     Returns:
         Literal type with enum values
     """
-    # Use Literal for enums
-    return Literal[tuple(enum_values)]
+    # Use Literal for enums; values are keyed with their type, since 1 == True == 1.0 as dict keys
+    try:
+        return _cached_literal(tuple((type(value), value) for value in enum_values))
+    except TypeError:
+        # An unhashable value, e.g. a list
+        return Literal[tuple(enum_values)]
+
+
+# Pattern constraints standing in for the JSON Schema string formats
+_FORMAT_PATTERNS = {
+    # Basic email pattern
+    "email": r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$',
+    "uuid": r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$',
+    "date": r'^\d{4}-\d{2}-\d{2}$',
+    "date-time": r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}',
+    "time": r'^\d{2}:\d{2}:\d{2}$',
+    "ipv4": r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$',
+}
 
 
 def _get_string_constraints(field_info: Dict[str, Any]) -> Dict[str, Any]:
@@ -128,23 +247,11 @@ def _get_string_constraints(field_info: Dict[str, Any]) -> Dict[str, Any]:
     if "pattern" in field_info:
         constraints["pattern"] = field_info["pattern"]
 
-    if "format" in field_info:
-        # Pydantic doesn't natively support all JSON Schema formats
-        # but we can add pattern constraints for some
-        fmt = field_info["format"]
-        if fmt == "email":
-            # Basic email pattern
-            constraints["pattern"] = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-        elif fmt == "uuid":
-            constraints["pattern"] = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
-        elif fmt == "date":
-            constraints["pattern"] = r'^\d{4}-\d{2}-\d{2}$'
-        elif fmt == "date-time":
-            constraints["pattern"] = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}'
-        elif fmt == "time":
-            constraints["pattern"] = r'^\d{2}:\d{2}:\d{2}$'
-        elif fmt == "ipv4":
-            constraints["pattern"] = r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$'
+    # Pydantic doesn't natively support all JSON Schema formats
+    # but we can add pattern constraints for some
+    format_pattern = _FORMAT_PATTERNS.get(field_info.get("format"))
+    if format_pattern is not None:
+        constraints["pattern"] = format_pattern
 
     if "minLength" in field_info:
         constraints["min_length"] = field_info["minLength"]
@@ -190,7 +297,117 @@ def _get_array_constraints(field_info: Dict[str, Any]) -> Dict[str, Any]:
     return constraints
 
 
-def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type]) -> Type:
+def _has_ref(schema: Any) -> bool:
+    """Whether a $ref appears anywhere in the schema"""
+    if isinstance(schema, dict):
+        return "$ref" in schema or any(_has_ref(value) for value in schema.values())
+    if isinstance(schema, list):
+        return any(_has_ref(value) for value in schema)
+    return False
+
+
+def _collect_object_fields(properties: Dict[str, Any], required_fields: frozenset, type_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type], typed_dict: bool, config: Optional[ConfigDict] = None) -> List[tuple]:
+    """
+    Resolve the properties of an object schema.
+
+    Returns:
+        (name, type, is_required, Field kwargs) for each property, in schema order
+    """
+    collected = []
+    for field_name, field_info in properties.items():
+        # Get field type
+        field_type = _schema_to_type(field_info, f"{type_name}_{field_name}", defs, model_cache, typed_dict, config)
+
+        # Handle forward references for recursion
+        if field_type == type_name:
+            field_type = f"'{type_name}'"
+
+        # Build Field kwargs
+        field_kwargs = {"description": field_info.get("description", "")}
+
+        # Add array constraints if this is an array field
+        if field_info.get("type") == "array":
+            field_kwargs.update(_get_array_constraints(field_info))
+
+        collected.append((field_name, field_type, field_name in required_fields, field_kwargs))
+    return collected
+
+
+def _object_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type], typed_dict: bool, as_typed_dict: bool, config: Optional[ConfigDict] = None) -> Type:
+    """
+    Convert an object schema to a Pydantic model or a TypedDict.
+
+    Args:
+        schema: The object JSON schema
+        type_name: Name for the type
+        defs: The $defs dictionary
+        model_cache: Cache of already created models
+        typed_dict: Build inline objects nested in this one as TypedDicts
+        as_typed_dict: Build this object itself as a TypedDict
+        config: Model config for the created models
+
+    Returns:
+        The created model or TypedDict
+    """
+    # Check if this model is already in cache (for recursion)
+    if type_name in model_cache:
+        return model_cache[type_name]
+
+    # Create placeholder for recursive references
+    model_cache[type_name] = None
+
+    properties = schema.get("properties", {})
+    required_fields = frozenset(schema.get("required", ()))
+
+    # Resolve every field first, then assemble them in one pass for the chosen kind of type
+    collected = _collect_object_fields(properties, required_fields, type_name, defs, model_cache, typed_dict, config)
+
+    if as_typed_dict:
+        # TypedDict keys carry their constraints via Annotated; optional keys may be omitted
+        fields = {
+            name: Annotated[field_type, PydanticField(**field_kwargs)] if is_required
+            else _subscript(NotRequired, Annotated[_union((field_type, _NULL_TYPE)), PydanticField(**field_kwargs)])
+            for name, field_type, is_required, field_kwargs in collected
+        }
+    else:
+        fields = {
+            name: (field_type, PydanticField(..., **field_kwargs)) if is_required
+            else (_union((field_type, _NULL_TYPE)), PydanticField(None, **field_kwargs))
+            for name, field_type, is_required, field_kwargs in collected
+        }
+
+    # Closed objects reject unknown keys instead of dropping them, as models and TypedDicts alike
+    closed = schema.get("additionalProperties") is False
+
+    # Create the model
+    if as_typed_dict:
+        model = TypedDict(type_name, fields)
+        model.__pydantic_config__ = _FORBID_EXTRA_CONFIG if closed else _ALLOW_EXTRA_TYPED_DICT_CONFIG
+    else:
+        if closed:
+            model_config = _FORBID_EXTRA_DEFERRED_CONFIG if config is not None else _FORBID_EXTRA_CONFIG
+        else:
+            model_config = config
+        model = create_model(type_name, __config__=model_config, **fields)
+    model_cache[type_name] = model
+
+    return model
+
+
+# Python types for the members of a type array (e.g. ["string", "null"])
+_PRIMITIVE_TYPES = {
+    "null": _NULL_TYPE,
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+    # This is complex - would need items info
+    "array": list,
+    "object": dict,
+}
+
+
+def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any], model_cache: Dict[str, Type], typed_dict: bool = False, config: Optional[ConfigDict] = None) -> Type:
     """
     Convert a JSON schema to a Python type.
 
@@ -199,6 +416,8 @@ def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any]
         type_name: Name for the type
         defs: The $defs dictionary
         model_cache: Cache of already created models
+        typed_dict: Build inline objects without a $ref in them as TypedDicts instead of models ($defs stay models)
+        config: Model config for the created models
 
     Returns:
         Python type corresponding to the schema
@@ -209,11 +428,11 @@ def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any]
         if ref == "#":
             # Root self-reference - return forward reference
             return type_name
-        return _resolve_ref(ref, defs, model_cache)
+        return _resolve_ref(ref, defs, model_cache, config)
 
     # Handle anyOf
     if "anyOf" in schema:
-        return _handle_anyof(schema["anyOf"], type_name, defs, model_cache)
+        return _handle_anyof(schema["anyOf"], type_name, defs, model_cache, typed_dict, config)
 
     # Handle enum
     if "enum" in schema:
@@ -224,78 +443,19 @@ def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any]
 
     # Handle union types (type as array, e.g., ["string", "null"])
     if isinstance(schema_type, list):
-        types = []
-        for t in schema_type:
-            if t == "null":
-                types.append(type(None))
-            elif t == "string":
-                types.append(str)
-            elif t == "integer":
-                types.append(int)
-            elif t == "number":
-                types.append(float)
-            elif t == "boolean":
-                types.append(bool)
-            elif t == "array":
-                # This is complex - would need items info
-                types.append(list)
-            elif t == "object":
-                types.append(dict)
-        return Union[tuple(types)] if len(types) > 1 else types[0]
+        types = [_PRIMITIVE_TYPES[t] for t in schema_type if t in _PRIMITIVE_TYPES]
+        return _union(tuple(types)) if len(types) > 1 else types[0]
 
     # Handle object
     if schema_type == "object":
-        # Check if this model is already in cache (for recursion)
-        if type_name in model_cache:
-            return model_cache[type_name]
-
-        # Create placeholder for recursive references
-        model_cache[type_name] = None
-
-        properties = schema.get("properties", {})
-        required_fields = schema.get("required", [])
-
-        fields = {}
-        for field_name, field_info in properties.items():
-            is_required = field_name in required_fields
-
-            # Get field type
-            field_type = _schema_to_type(field_info, f"{type_name}_{field_name}", defs, model_cache)
-
-            # Handle forward references for recursion
-            if field_type == type_name:
-                field_type = f"'{type_name}'"
-
-            # Get description
-            description = field_info.get("description", "")
-
-            # Build Field kwargs
-            field_kwargs = {"description": description}
-
-            # Add array constraints if this is an array field
-            if field_info.get("type") == "array":
-                array_constraints = _get_array_constraints(field_info)
-                field_kwargs.update(array_constraints)
-
-            # Create field with constraints
-            if is_required:
-                default = ...
-            else:
-                default = None
-                field_type = Optional[field_type]
-
-            fields[field_name] = (field_type, PydanticField(default, **field_kwargs))
-
-        # Create the model
-        model = create_model(type_name, **fields)
-        model_cache[type_name] = model
-
-        return model
+        # Only leaf objects become TypedDicts; references may be recursive and need a model to resolve
+        as_typed_dict = typed_dict and not _has_ref(schema)
+        return _object_type(schema, type_name, defs, model_cache, typed_dict, as_typed_dict=as_typed_dict, config=config)
 
     # Handle array
     if schema_type == "array":
         items_schema = schema.get("items", {})
-        item_type = _schema_to_type(items_schema, f"{type_name}Item", defs, model_cache)
+        item_type = _schema_to_type(items_schema, f"{type_name}Item", defs, model_cache, typed_dict, config)
 
         # Handle forward references
         if isinstance(item_type, str):
@@ -303,7 +463,7 @@ def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any]
 
         # Note: Array constraints (minItems, maxItems) are applied via Field in the parent object
         # We just return the List type here
-        return List[item_type]
+        return _subscript(List, item_type)
 
     # Handle primitives with constraints
     if schema_type == "string":
@@ -327,14 +487,23 @@ def _schema_to_type(schema: Dict[str, Any], type_name: str, defs: Dict[str, Any]
     elif schema_type == "boolean":
         return bool
     elif schema_type == "null":
-        return type(None)
+        return _NULL_TYPE
 
     # Default to Any for unknown types
     logger.warning(f"Unknown schema type: {schema_type}, defaulting to Any")
     return Any
 
 
-def create_pydantic_model_from_json_schema(schema_json: Dict[str, Any], model_name: str):
+def _from_trusted(cls, data: Dict[str, Any]):
+    """
+    Create an instance from trusted data (e.g. dicts this service stored itself) without validating it.
+
+    Nested objects are kept as the given dicts rather than converted to their models.
+    """
+    return cls.model_construct(**data)
+
+
+def create_pydantic_model_from_json_schema(schema_json: Dict[str, Any], model_name: str, typed_dict: bool = False, defer_build: bool = False):
     """
     Create a Pydantic model from a JSON schema dictionary.
 
@@ -349,33 +518,60 @@ def create_pydantic_model_from_json_schema(schema_json: Dict[str, Any], model_na
     Args:
         schema_json: The JSON schema dictionary
         model_name: Name for the generated Pydantic model
+        typed_dict: Build nested inline objects with no $ref inside as TypedDicts (the root stays a model).
+            Cheaper to validate for data that is only read after parsing.
+        defer_build: Defer building the validators until a model is first used,
+            so models that are only created never pay for it.
 
     Returns:
-        Dynamically created Pydantic model class
+        Dynamically created Pydantic model class, with a `from_trusted(data)` classmethod
+        that skips validation for trusted data (nested objects stay plain dicts).
+        Root schemas that are not objects return the matching type instead, e.g. `str`
     """
+    schema_digest = _schema_digest(schema_json)
+    cache_key = (model_name, typed_dict, defer_build, schema_digest)
+    cached = _MODEL_CACHE.get(cache_key)
+    if cached is not None:
+        with _MODEL_CACHE_LOCK:
+            # Another thread may have evicted it since the lookup
+            if cache_key in _MODEL_CACHE:
+                _MODEL_CACHE.move_to_end(cache_key)
+        return cached
+
     # Extract $defs if present
     defs = schema_json.get("$defs", {})
 
     # Model cache for handling recursion and references
     model_cache: Dict[str, Type] = {}
+    config = _DEFERRED_CONFIG if defer_build else None
 
     # Create the root model
-    result = _schema_to_type(schema_json, model_name, defs, model_cache)
-
-    # Rebuild all models to resolve forward references
-    for model in model_cache.values():
-        if model is not None and hasattr(model, 'model_rebuild'):
-            try:
-                model.model_rebuild()
-            except Exception as e:
-                logger.debug(f"Failed to rebuild model: {e}")
-
-    # If result is a model, return it
-    if isinstance(result, type):
-        return result
-
-    # Otherwise wrap in a model
-    return create_model(model_name, __root__=(result, ...))
+    if typed_dict and schema_json.get("type") == "object" and not {"$ref", "anyOf", "enum"} & schema_json.keys():
+        result = _object_type(schema_json, model_name, defs, model_cache, typed_dict=True, as_typed_dict=False, config=config)
+    else:
+        result = _schema_to_type(schema_json, model_name, defs, model_cache, typed_dict, config)
+
+    # Rebuild the models left incomplete by forward references (deferred models do this on first use)
+    if not defer_build:
+        for model in model_cache.values():
+            if model is not None and hasattr(model, 'model_rebuild') and not model.__pydantic_complete__:
+                try:
+                    model.model_rebuild()
+                except Exception as e:
+                    logger.debug(f"Failed to rebuild model: {e}")
+
+    # If result is a model, return it; otherwise wrap in a model
+    if not isinstance(result, type):
+        result = create_model(model_name, __config__=config, __root__=(result, ...))
+    # Only models can construct without validation; primitive and Any roots are shared builtins
+    if isinstance(result, type) and issubclass(result, BaseModel):
+        result.from_trusted = classmethod(_from_trusted)
+
+    with _MODEL_CACHE_LOCK:
+        _MODEL_CACHE[cache_key] = result
+        while len(_MODEL_CACHE) > MODEL_CACHE_SIZE:
+            _MODEL_CACHE.popitem(last=False)
+    return result
 
 async def load_schema_model(schema_name: str, user_id: str = None):
     """
@@ -391,40 +587,34 @@ async def load_schema_model(schema_name: str, user_id: str = None):
     Raises:
         ValueError: If schema is not found in memory store
     """
-    from langgraph.config import get_store
-
     logger.debug(f"Loading schema model: {schema_name} for user: {user_id}")
 
     # Use LangGraph's get_store() to access the managed store
     store = get_store()
     logger.debug(f"Got store from get_store(): {type(store)}")
 
-    # Try user-specific namespace first if user_id provided
-    if user_id:
-        try:
-            namespace = (user_id, "schemas")
-            logger.debug(f"Trying user-specific namespace: {namespace}")
-            result = await store.aget(namespace, schema_name)
-            if result:
-                logger.debug(f"Found schema in user-specific namespace")
-                schema_json = result.value
+    # Probe the user-specific namespace (if user_id provided) and the global namespace
+    # (kept for backwards compatibility) together; the user-specific schema wins
+    namespaces = [(user_id, "schemas")] if user_id else []
+    namespaces.append(("schemas",))
+    results = await asyncio.gather(
+        *(store.aget(namespace, schema_name) for namespace in namespaces),
+        return_exceptions=True,
+    )
+
+    for namespace, result in zip(namespaces, results):
+        if isinstance(result, Exception):
+            logger.debug(f"Error accessing namespace {namespace}: {result}")
+        elif result:
+            logger.debug(f"Found schema in namespace {namespace}")
+            try:
+                # Store values are dicts; a schema saved as raw JSON text is decoded here
+                schema_json = result.value if isinstance(result.value, dict) else orjson.loads(result.value)
                 return create_pydantic_model_from_json_schema(schema_json, schema_name)
-            else:
-                logger.debug(f"Schema not found in user-specific namespace")
-        except Exception as e:
-            logger.debug(f"Error accessing user-specific namespace: {e}")
-
-    # Fallback to global namespace for backwards compatibility
-    try:
-        global_namespace = ("schemas",)
-        logger.debug(f"Trying global namespace: {global_namespace}")
-        result = await store.aget(global_namespace, schema_name)
-        if result:
-            schema_json = result.value
-            logger.debug(f"Found schema in global namespace")
-            return create_pydantic_model_from_json_schema(schema_json, schema_name)
-    except Exception as e:
-        logger.debug(f"Error accessing global namespace: {e}")
+            except Exception as e:
+                logger.debug(f"Error building schema from namespace {namespace}: {e}")
+        else:
+            logger.debug(f"Schema not found in namespace {namespace}")
 
     logger.warning(f"Schema {schema_name} not found in any namespace")
     raise ValueError(f"Schema {schema_name} not found in memory store")
\ No newline at end of file
@@ -1,5 +1,6 @@
 import logging
 import aiohttp
+import orjson
 from typing import Dict, Optional, Any
 from langchain_core.runnables import RunnableConfig
 from langgraph.config import get_store
@@ -38,7 +39,7 @@ async def get_mcp_access_token(
                 data=form_data,
             ) as token_response:
                 if token_response.status == 200:
-                    token_data = await token_response.json()
+                    token_data = await token_response.json(loads=orjson.loads)
                     return token_data
                 else:
                     response_text = await token_response.text()
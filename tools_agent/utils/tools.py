@@ -1,6 +1,7 @@
 from typing import Annotated
 from langchain_core.tools import StructuredTool, ToolException, tool
 import aiohttp
+import orjson
 import re
 import logging
 from mcp.client.streamable_http import streamablehttp_client
@@ -104,7 +105,7 @@ async def create_rag_tool(rag_url: str, collection_id: str, access_token: str):
             ) as response:
                 logger.debug(f"[RAG Tool] Metadata response status: {response.status}")
                 response.raise_for_status()
-                collection_data = await response.json()
+                collection_data = await response.json(loads=orjson.loads)
 
         # Get the collection name and sanitize it to match the required regex pattern
         raw_collection_name = collection_data.get("name", f"collection_{collection_id}")
@@ -139,11 +140,11 @@ async def create_rag_tool(rag_url: str, collection_id: str, access_token: str):
                 async with aiohttp.ClientSession() as session:
                     async with session.post(
                         search_endpoint,
-                        json=payload,
-                        headers={"Authorization": f"Bearer {access_token}"},
+                        data=orjson.dumps(payload),
+                        headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
                     ) as search_response:
                         search_response.raise_for_status()
-                        documents = await search_response.json()
+                        documents = await search_response.json(loads=orjson.loads)
                         logger.info(f"[RAG Query] Retrieved {len(documents)} documents for '{collection_name}'")
 
                 formatted_docs = "<all-documents>\n"